@@ -0,0 +1,61 @@
+"""
+Benchmark: PatternStore.match vs ShardedMatcher across store sizes.
+
+Reports mean per-query latency of the in-process matcher and the sharded
+process-pool matcher, and the smallest store size at which sharding wins.
+The crossover depends on core count and on how many patterns each query
+touches, so run it on the target machine.
+
+Run: python benchmarks/bench_parallel.py [--workers N] [n_patterns ...]
+"""
+
+import argparse
+import os
+import time
+
+from synthetic import synthetic_patterns, synthetic_problems
+
+from src.parallel import ShardedMatcher
+from src.store import PatternStore
+
+
+def per_query(fn, problems) -> float:
+    start = time.perf_counter()
+    for problem in problems:
+        fn(problem, threshold=0.3, top_k=10)
+    return (time.perf_counter() - start) / len(problems)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=[1_000, 10_000, 50_000, 200_000])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    problems = synthetic_problems(args.queries)
+    print(f"{args.workers} workers, {args.queries} queries, threshold=0.3, top_k=10")
+    print(f"{'patterns':>10} {'match (ms)':>12} {'sharded (ms)':>14} {'speedup':>9}")
+
+    crossover = None
+    for n in args.sizes:
+        store = PatternStore()
+        for p in synthetic_patterns(n):
+            store.add(p)
+        with ShardedMatcher(store, workers=args.workers) as matcher:
+            matcher.match(problems[0])  # start workers and ship shards
+            serial = per_query(store.match, problems)
+            sharded = per_query(matcher.match, problems)
+        speedup = serial / sharded
+        if speedup > 1 and crossover is None:
+            crossover = n
+        print(f"{n:>10} {serial * 1e3:>12.2f} {sharded * 1e3:>14.2f} {speedup:>8.2f}x")
+
+    if crossover is None:
+        print("sharding did not beat in-process matching at these sizes")
+    else:
+        print(f"crossover: sharding wins from ~{crossover} patterns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: JSON vs binary PatternStore serialization.
+
+Compares file size, save time and load time of PatternStore.save/load
+against save_binary/load_binary.
+
+Run: python benchmarks/bench_serialization.py [n_patterns ...]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import synthetic_patterns
+
+from src.store import PatternStore
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def bench(n: int) -> None:
+    store = PatternStore()
+    for p in synthetic_patterns(n):
+        store.add(p)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = Path(tmp) / "store.json"
+        bin_path = Path(tmp) / "store.apsb"
+
+        json_save = timed(store.save, json_path)
+        bin_save = timed(store.save_binary, bin_path)
+        json_load = timed(PatternStore().load, json_path)
+        bin_load = timed(PatternStore().load_binary, bin_path)
+        json_size = json_path.stat().st_size
+        bin_size = bin_path.stat().st_size
+
+    print(f"{n:>8} patterns")
+    print(f"  {'':8} {'size (KB)':>12} {'save (s)':>10} {'load (s)':>10}")
+    print(f"  {'json':8} {json_size / 1024:>12.1f} {json_save:>10.3f} {json_load:>10.3f}")
+    print(f"  {'binary':8} {bin_size / 1024:>12.1f} {bin_save:>10.3f} {bin_load:>10.3f}")
+    print(f"  binary/json: size {bin_size / json_size:.2f}x, "
+          f"save {bin_save / json_save:.2f}x, load {bin_load / json_load:.2f}x")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 50_000]
+    for n in sizes:
+        bench(n)
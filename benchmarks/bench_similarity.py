@@ -0,0 +1,55 @@
+"""
+Benchmark: exact vs approximate (LSH) PatternStore.similar across store sizes.
+
+Reports the one-off index build time, mean per-query latency of exact and
+approximate search, and the approximate search's recall of the exact
+top-k.
+
+Run: python benchmarks/bench_similarity.py [--k K] [n_patterns ...]
+"""
+
+import argparse
+import time
+
+from synthetic import synthetic_patterns, synthetic_problems
+
+from src.store import PatternStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=[1_000, 10_000, 50_000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    problems = synthetic_problems(args.queries)
+    print(f"{args.queries} queries, k={args.k}")
+    print(f"{'patterns':>10} {'build (s)':>10} {'exact (ms)':>11} {'approx (ms)':>12} {'recall':>7}")
+
+    for n in args.sizes:
+        store = PatternStore()
+        for p in synthetic_patterns(n):
+            store.add(p)
+
+        start = time.perf_counter()
+        store.similar(problems[0], args.k)
+        store.similar(problems[0], args.k, approximate=True)  # build LSH tables
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        exact = [store.similar(p, args.k) for p in problems]
+        exact_time = (time.perf_counter() - start) / len(problems)
+        start = time.perf_counter()
+        approx = [store.similar(p, args.k, approximate=True) for p in problems]
+        approx_time = (time.perf_counter() - start) / len(problems)
+
+        found = sum(
+            len({m.pattern.id for m in a} & {m.pattern.id for m in e}) for a, e in zip(approx, exact)
+        )
+        recall = found / max(sum(len(e) for e in exact), 1)
+        print(f"{n:>10} {build:>10.2f} {exact_time * 1e3:>11.2f} {approx_time * 1e3:>12.2f} {recall:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
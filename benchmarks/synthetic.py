@@ -0,0 +1,94 @@
+"""
+Synthetic pattern generation shared by the benchmarks.
+
+Patterns are random but reproducible (seeded), with a feature vocabulary
+and structure sizes in the range of real pattern stores.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Allow running from project root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.core import (
+    CompositionType,
+    Constraint,
+    Entity,
+    Goal,
+    GoalType,
+    Instantiation,
+    Operation,
+    Pattern,
+    Postcondition,
+    Problem,
+    Relation,
+    Solution,
+    Step,
+    Structure,
+    Transformation,
+)
+
+FEATURES = [
+    "recursive_decomposability", "linear_chain", "tree", "cycle", "bipartite",
+    "iterative", "has_contractive_map", "independent_subproblems", "has_known_solution",
+    "monotone", "has_invariant", "finite_state",
+] + [f"feature_{i}" for i in range(48)]
+ENTITY_TYPES = ["collection", "element", "operation", "container", "relation", "agent"]
+RELATION_TYPES = ["contains", "depends_on", "maps_to", "ordered_before"]
+DOMAINS = ["mathematics", "algorithms", "management", "compilers", "economics", "machine_learning"]
+TAGS = ["classic", "graph", "optimization", "search", "numeric", "symbolic", "planning", "data"]
+
+
+def synthetic_problem(rng: random.Random, pid: str) -> Problem:
+    n = rng.randint(2, 8)
+    entities = [Entity(f"e{i}", rng.choice(ENTITY_TYPES), {"size": rng.choice(["n", "n/2", "1"])}) for i in range(n)]
+    relations = [
+        Relation(f"e{rng.randrange(n)}", f"e{rng.randrange(n)}", rng.choice(RELATION_TYPES))
+        for _ in range(rng.randint(1, 2 * n))
+    ]
+    return Problem(
+        id=pid,
+        name=f"Problem {pid}",
+        structure=Structure(entities, relations),
+        constraints=[Constraint("parts are independent", ["e0", "e1"])],
+        goal=Goal(rng.choice(list(GoalType)), "e0", "e0 is in solved state"),
+        tags=rng.sample(FEATURES, rng.randint(1, 4)),
+    )
+
+
+def synthetic_pattern(rng: random.Random, i: int) -> Pattern:
+    steps = [
+        Step(rng.choice(list(Operation)), {"rule": "merge"}, f"r{j}", "Combine sub-solutions into a complete solution")
+        for j in range(rng.randint(1, 4))
+    ]
+    solution = Solution(
+        id=f"sol-{i}",
+        name=f"Solution {i}",
+        preconditions=rng.sample(FEATURES, rng.randint(1, 5)),
+        transformation=Transformation(steps, rng.choice(list(CompositionType))),
+        postconditions=[Postcondition("whole is solved", "goal satisfied")],
+    )
+    return Pattern(
+        id=f"pat-{i:07d}",
+        name=f"Pattern {i}",
+        description="When a problem has this structure, apply the transformation and combine the results.",
+        problem=synthetic_problem(rng, f"prob-{i}"),
+        solution=solution,
+        instantiations=[
+            Instantiation(rng.choice(DOMAINS), "Some concrete problem", "Some concrete solution")
+            for _ in range(rng.randint(0, 3))
+        ],
+        tags=rng.sample(TAGS, rng.randint(0, 3)),
+    )
+
+
+def synthetic_patterns(n: int, seed: int = 0) -> list[Pattern]:
+    rng = random.Random(seed)
+    return [synthetic_pattern(rng, i) for i in range(n)]
+
+
+def synthetic_problems(n: int, seed: int = 1) -> list[Problem]:
+    rng = random.Random(seed)
+    return [synthetic_problem(rng, f"query-{i}") for i in range(n)]
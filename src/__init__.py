@@ -6,6 +6,7 @@ abstract structures, enabling solution reuse across mathematics, software
 engineering, and any other domain.
 """
 
+from .aio import AsyncPatternStore
 from .core import (
     Entity,
     Relation,
@@ -20,8 +21,29 @@ from .core import (
     Pattern,
     Instantiation,
 )
-from .mapping import DomainMapping, abstract, instantiate
-from .store import PatternStore
+from .features import FeatureVocabulary
+from .isomorphism import StructureSignature, find_embedding, is_isomorphic, structure_hash
+from .mapping import CompiledMapping, DomainMapping, abstract, abstract_many, instantiate, read_jsonl
+from .mapped import MappedPatternStore
+from .parallel import ShardedMatcher
+from .query import (
+    All,
+    And,
+    CompositionIs,
+    GoalTypeIs,
+    HasPrecondition,
+    HasTag,
+    InDomain,
+    Not,
+    Or,
+    Query,
+    parse_query,
+)
+from .scoring import BM25, IDF, Overlap, Scorer, Weighted
+from .similarity import embed
+from .sqlite_store import SQLitePatternStore
+from .store import PatternStore, SimilarityMatch, StructuralMatch
+from .threadsafe import ReadWriteLock, ThreadSafePatternStore
 
 __all__ = [
     "Entity",
@@ -36,8 +58,41 @@ __all__ = [
     "Domain",
     "Pattern",
     "Instantiation",
+    "FeatureVocabulary",
     "DomainMapping",
+    "CompiledMapping",
     "abstract",
+    "abstract_many",
+    "read_jsonl",
     "instantiate",
     "PatternStore",
+    "Scorer",
+    "Overlap",
+    "IDF",
+    "BM25",
+    "Weighted",
+    "StructuralMatch",
+    "SimilarityMatch",
+    "StructureSignature",
+    "find_embedding",
+    "is_isomorphic",
+    "structure_hash",
+    "embed",
+    "MappedPatternStore",
+    "SQLitePatternStore",
+    "ShardedMatcher",
+    "ThreadSafePatternStore",
+    "AsyncPatternStore",
+    "ReadWriteLock",
+    "Query",
+    "HasTag",
+    "InDomain",
+    "HasPrecondition",
+    "GoalTypeIs",
+    "CompositionIs",
+    "And",
+    "Or",
+    "Not",
+    "All",
+    "parse_query",
 ]
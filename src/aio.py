@@ -0,0 +1,187 @@
+"""
+Asyncio facade over a PatternStore.
+
+Matching, loading and saving run in an executor so a large store never
+stalls the event loop:
+
+    store = AsyncPatternStore()
+    await store.aload("patterns.json")
+    results = await store.amatch(problem, top_k=5, timeout=0.5)
+    async for pattern in store.asearch_by_tag("graph"):
+        ...
+
+Identical match requests in flight at the same time (same problem
+features, threshold and top_k) share a single computation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterable
+
+from .core import Pattern, Problem
+from .store import MatchResult, PatternStore
+from .threadsafe import ThreadSafePatternStore
+
+
+class _LoadCancelled(Exception):
+    """Raised inside a worker thread to stop a load whose awaiting task was cancelled."""
+
+
+class AsyncPatternStore:
+    """
+    Async facade over a PatternStore.
+
+    The wrapped store is used from executor threads while the loop keeps
+    running, so it should be thread-safe; by default a new
+    ThreadSafePatternStore is created.
+
+    Cancellation and timeouts: a cancelled or timed-out amatch stops
+    waiting immediately. The shared computation is cancelled only when no
+    other caller is waiting for it and it has not started yet (a running
+    thread cannot be interrupted). A cancelled aload/aload_binary stops
+    after the pattern being added; patterns loaded so far stay in the store.
+    """
+
+    def __init__(self, store: PatternStore | None = None, executor: Executor | None = None) -> None:
+        self.store = store if store is not None else ThreadSafePatternStore()
+        self.executor = executor
+        # (features, threshold, top_k) → [shared task, number of waiters]
+        self._inflight: dict[tuple, list[Any]] = {}
+
+    async def _run(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    # -- matching -----------------------------------------------------------
+
+    async def amatch(
+        self,
+        problem: Problem,
+        threshold: float = 0.5,
+        top_k: int | None = None,
+        timeout: float | None = None,
+    ) -> list[MatchResult]:
+        """store.match in the executor, coalescing identical concurrent requests."""
+        features = await self._run(lambda: problem.match_features)
+        key = (features, threshold, top_k)
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(self._run(self.store.match, problem, threshold, top_k))
+            entry = [task, 0]
+            self._inflight[key] = entry
+            task.add_done_callback(lambda _: self._forget(key, entry))
+        task = entry[0]
+        entry[1] += 1
+        try:
+            results = await asyncio.wait_for(asyncio.shield(task), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if entry[1] == 1 and not task.done():
+                # Forget the task now, not in its done callback, so a request
+                # arriving before the callback runs starts a fresh one
+                self._forget(key, entry)
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+        return list(results)
+
+    def _forget(self, key: tuple, entry: list[Any]) -> None:
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    async def abest_match(
+        self,
+        problem: Problem,
+        threshold: float = 0.5,
+        timeout: float | None = None,
+    ) -> MatchResult | None:
+        results = await self.amatch(problem, threshold, top_k=1, timeout=timeout)
+        return results[0] if results else None
+
+    async def amatch_many(
+        self,
+        problems: Iterable[Problem],
+        threshold: float = 0.5,
+        top_k: int | None = None,
+        timeout: float | None = None,
+    ) -> list[list[MatchResult]]:
+        problems = list(problems)
+        return await asyncio.wait_for(
+            self._run(self.store.match_many, problems, threshold, top_k), timeout,
+        )
+
+    # -- search -------------------------------------------------------------
+
+    async def asearch_by_tag(self, *tags: str) -> AsyncIterator[Pattern]:
+        for pattern in await self._run(self.store.search_by_tag, *tags):
+            yield pattern
+
+    async def asearch_by_domain(self, domain: str) -> AsyncIterator[Pattern]:
+        for pattern in await self._run(self.store.search_by_domain, domain):
+            yield pattern
+
+    async def aquery(self, query: Any) -> AsyncIterator[Pattern]:
+        for pattern in await self._run(self.store.query, query):
+            yield pattern
+
+    # -- persistence --------------------------------------------------------
+
+    async def aload(
+        self,
+        path: str | Path,
+        progress: Callable[[int, int], None] | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        """store.load in the executor; progress is called on the event loop."""
+        await self._load(self.store.load, path, progress, timeout)
+
+    async def aload_binary(
+        self,
+        path: str | Path,
+        progress: Callable[[int, int], None] | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        await self._load(self.store.load_binary, path, progress, timeout)
+
+    async def _load(
+        self,
+        load: Callable[..., None],
+        path: str | Path,
+        progress: Callable[[int, int], None] | None,
+        timeout: float | None,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        cancelled = threading.Event()
+
+        def report(count: int, bytes_read: int) -> None:
+            if cancelled.is_set():
+                raise _LoadCancelled
+            if progress is not None:
+                loop.call_soon_threadsafe(progress, count, bytes_read)
+
+        future = asyncio.ensure_future(self._run(load, path, report))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            cancelled.set()
+            # Let the worker stop before handing control back
+            try:
+                await future
+            except _LoadCancelled:
+                pass
+            raise
+
+    async def asave(self, path: str | Path, timeout: float | None = None) -> None:
+        await asyncio.wait_for(self._run(self.store.save, path), timeout)
+
+    async def asave_binary(self, path: str | Path, timeout: float | None = None) -> None:
+        await asyncio.wait_for(self._run(self.store.save_binary, path), timeout)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __repr__(self) -> str:
+        return f"AsyncPatternStore({self.store!r})"
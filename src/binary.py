@@ -0,0 +1,288 @@
+"""
+Compact binary serialization for the PatternStore.
+
+File layout (all integers little-endian):
+
+    header    magic "APSB" | u16 version | u16 flags | u32 record count
+              | u64 string table offset | u64 index offset
+    records   one per pattern: u32 payload length | payload
+    strings   u32 length | JSON array of interned strings
+    index     u32 length | JSON array of index entries
+
+A record payload is compact JSON of positional arrays (no repeated keys).
+Vocabulary strings (entity/relation/constraint/goal types, operations,
+composition types, preconditions, tags, domains) are stored once in the
+string table and referenced by position.
+
+Each index entry is [pattern id, payload offset, payload length,
+precondition refs, tag refs, domain refs, goal type ref, composition type
+ref], so a reader can match and filter patterns without decoding their
+records. The goal type ref is -1 when the problem has no goal.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Iterable, Iterator
+
+import json
+import struct
+
+from .core import (
+    CompositionType,
+    Constraint,
+    ConstraintType,
+    Entity,
+    Goal,
+    GoalType,
+    Instantiation,
+    Operation,
+    Pattern,
+    Postcondition,
+    Problem,
+    Relation,
+    Solution,
+    Step,
+    Structure,
+    Transformation,
+)
+
+MAGIC = b"APSB"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHIQQ")
+_LENGTH = struct.Struct("<I")
+_COMPACT = (",", ":")
+
+
+@dataclass
+class IndexEntry:
+    """Location and match keys of one record, readable without decoding it."""
+
+    pattern_id: str
+    offset: int
+    length: int
+    preconditions: list[str]
+    tags: list[str]
+    domains: list[str]
+    goal_type: str | None  # None when the problem has no goal
+    composition_type: str
+
+
+@dataclass
+class Header:
+    version: int
+    count: int
+    strings_offset: int
+    index_offset: int
+
+
+class _Interner:
+    def __init__(self) -> None:
+        self.refs: dict[str, int] = {}
+        self.strings: list[str] = []
+
+    def __call__(self, s: str) -> int:
+        ref = self.refs.get(s)
+        if ref is None:
+            ref = len(self.strings)
+            self.refs[s] = ref
+            self.strings.append(s)
+        return ref
+
+    def many(self, items: Iterable[str]) -> list[int]:
+        return [self(s) for s in items]
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def write_patterns(fp: BinaryIO, patterns: Iterable[Pattern]) -> int:
+    """
+    Write patterns to a seekable binary file. Returns the number written.
+
+    Records are streamed as they are encoded; the header is patched at
+    the end once the string table and index offsets are known.
+    """
+    intern = _Interner()
+    index: list[list[Any]] = []
+    start = fp.tell()
+    fp.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0, 0, 0))
+    offset = _HEADER.size  # offsets are relative to the header
+
+    for pattern in patterns:
+        payload = json.dumps(
+            _encode_pattern(pattern, intern), separators=_COMPACT, ensure_ascii=False,
+        ).encode("utf-8")
+        fp.write(_LENGTH.pack(len(payload)))
+        fp.write(payload)
+        offset += _LENGTH.size
+        index.append([
+            pattern.id,
+            offset,
+            len(payload),
+            intern.many(dict.fromkeys(pattern.solution.preconditions)),
+            intern.many(dict.fromkeys(pattern.tags)),
+            intern.many(dict.fromkeys(i.domain for i in pattern.instantiations)),
+            intern(pattern.problem.goal.type.value) if pattern.problem.goal else -1,
+            intern(pattern.solution.transformation.composition_type.value),
+        ])
+        offset += len(payload)
+
+    strings_offset = offset
+    offset += _write_block(fp, intern.strings)
+    index_offset = offset
+    _write_block(fp, index)
+    end = fp.tell()
+
+    fp.seek(start)
+    fp.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(index), strings_offset, index_offset))
+    fp.seek(end)
+    return len(index)
+
+
+def _write_block(fp: BinaryIO, value: Any) -> int:
+    data = json.dumps(value, separators=_COMPACT, ensure_ascii=False).encode("utf-8")
+    fp.write(_LENGTH.pack(len(data)))
+    fp.write(data)
+    return _LENGTH.size + len(data)
+
+
+def _encode_pattern(p: Pattern, intern: _Interner) -> list[Any]:
+    prob = p.problem
+    sol = p.solution
+    return [
+        p.id,
+        p.name,
+        p.description,
+        [
+            prob.id,
+            prob.name,
+            [[e.id, intern(e.type), e.properties] for e in prob.structure.entities],
+            [[r.source, r.target, intern(r.type), r.properties] for r in prob.structure.relations],
+            [[c.predicate, c.over, intern(c.type.value)] for c in prob.constraints],
+            [intern(prob.goal.type.value), prob.goal.target, prob.goal.predicate] if prob.goal else None,
+            intern.many(prob.tags),
+        ],
+        [
+            sol.id,
+            sol.name,
+            intern.many(sol.preconditions),
+            [[intern(s.operation.value), s.args, s.binds, s.rationale] for s in sol.transformation.steps],
+            intern(sol.transformation.composition_type.value),
+            [[pc.predicate, pc.guarantees] for pc in sol.postconditions],
+        ],
+        [
+            [intern(i.domain), i.concrete_problem, i.concrete_solution, i.mapping_notes]
+            for i in p.instantiations
+        ],
+        p.related_patterns,
+        intern.many(p.tags),
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def read_header(data: bytes) -> Header:
+    """Parse and validate the fixed-size header at the start of data."""
+    if len(data) < _HEADER.size:
+        raise ValueError("not a pattern store file: truncated header")
+    magic, version, _flags, count, strings_offset, index_offset = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a pattern store file: bad magic")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported pattern store format version {version}")
+    return Header(version, count, strings_offset, index_offset)
+
+
+def read_block(data: Any, offset: int) -> Any:
+    """Decode the length-prefixed JSON block at offset (bytes or mmap)."""
+    (length,) = _LENGTH.unpack_from(data, offset)
+    start = offset + _LENGTH.size
+    return json.loads(data[start:start + length])
+
+
+def read_index(data: Any, header: Header, strings: list[str]) -> list[IndexEntry]:
+    return [
+        IndexEntry(
+            pattern_id=pattern_id,
+            offset=offset,
+            length=length,
+            preconditions=[strings[i] for i in pre],
+            tags=[strings[i] for i in tags],
+            domains=[strings[i] for i in domains],
+            goal_type=strings[goal_ref] if goal_ref >= 0 else None,
+            composition_type=strings[composition_ref],
+        )
+        for pattern_id, offset, length, pre, tags, domains, goal_ref, composition_ref
+        in read_block(data, header.index_offset)
+    ]
+
+
+def iter_file(fp: BinaryIO) -> Iterator[tuple[Pattern, int]]:
+    """
+    Decode every pattern of a binary store file, in record order.
+
+    Yields (pattern, bytes_read). Records are read one at a time, so only
+    the string table and the current record are held in memory.
+    """
+    start = fp.tell()
+    header = read_header(fp.read(_HEADER.size))
+    fp.seek(start + header.strings_offset)
+    (length,) = _LENGTH.unpack(fp.read(_LENGTH.size))
+    strings = json.loads(fp.read(length))
+
+    fp.seek(start + _HEADER.size)
+    bytes_read = _HEADER.size
+    for _ in range(header.count):
+        (length,) = _LENGTH.unpack(fp.read(_LENGTH.size))
+        payload = fp.read(length)
+        if len(payload) != length:
+            raise ValueError("truncated pattern store file")
+        bytes_read += _LENGTH.size + length
+        yield decode_record(payload, strings), bytes_read
+
+
+def decode_record(payload: bytes, strings: list[str]) -> Pattern:
+    """Rebuild a Pattern from one record payload."""
+    pid, name, description, prob, sol, insts, related, tags = json.loads(payload)
+    s = strings
+
+    p_id, p_name, entities, relations, constraints, goal, p_tags = prob
+    problem = Problem(
+        id=p_id,
+        name=p_name,
+        structure=Structure(
+            entities=[Entity(eid, s[t], props) for eid, t, props in entities],
+            relations=[Relation(src, tgt, s[t], props) for src, tgt, t, props in relations],
+        ),
+        constraints=[Constraint(pred, over, ConstraintType(s[t])) for pred, over, t in constraints],
+        goal=Goal(GoalType(s[goal[0]]), goal[1], goal[2]) if goal else None,
+        tags=[s[t] for t in p_tags],
+    )
+
+    s_id, s_name, pre, steps, composition, posts = sol
+    solution = Solution(
+        id=s_id,
+        name=s_name,
+        preconditions=[s[f] for f in pre],
+        transformation=Transformation(
+            steps=[Step(Operation(s[op]), args, binds, rationale) for op, args, binds, rationale in steps],
+            composition_type=CompositionType(s[composition]),
+        ),
+        postconditions=[Postcondition(pred, guarantees) for pred, guarantees in posts],
+    )
+
+    return Pattern(
+        id=pid,
+        name=name,
+        description=description,
+        problem=problem,
+        solution=solution,
+        instantiations=[Instantiation(s[d], cp, cs, notes) for d, cp, cs, notes in insts],
+        related_patterns=related,
+        tags=[s[t] for t in tags],
+    )
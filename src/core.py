@@ -11,7 +11,9 @@ Key concepts:
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+import weakref
+from collections import Counter
+from dataclasses import dataclass, field, fields
 from enum import Enum
 from typing import Any
 
@@ -40,6 +42,138 @@ class Relation:
     properties: dict[str, Any] = field(default_factory=dict)
 
 
+STRUCTURAL_FEATURES = ("recursive_decomposability", "linear_chain", "tree", "cycle", "bipartite")
+
+
+class _StructureIndex:
+    """Lookup tables over a Structure's entities and relations."""
+
+    def __init__(self, entities: list[Entity], relations: list[Relation]) -> None:
+        self.entities: dict[str, Entity] = {}
+        for e in entities:
+            self.entities.setdefault(e.id, e)
+
+        self.out_edges: dict[str, list[Relation]] = {}
+        self.in_edges: dict[str, list[Relation]] = {}
+        # Relations touching each entity in relation order, in both directions
+        # (a self-loop appears twice); neighbors() reads the far ends off these
+        self.incident: dict[str, list[Relation]] = {}
+        self.incident_by_type: dict[tuple[str, str], list[Relation]] = {}
+        for r in relations:
+            self.add_relation(r)
+
+    def add_relation(self, r: Relation) -> None:
+        self.out_edges.setdefault(r.source, []).append(r)
+        self.in_edges.setdefault(r.target, []).append(r)
+        self.incident.setdefault(r.source, []).append(r)
+        self.incident.setdefault(r.target, []).append(r)
+        self.incident_by_type.setdefault((r.source, r.type), []).append(r)
+        self.incident_by_type.setdefault((r.target, r.type), []).append(r)
+
+    def remove_relation(self, r: Relation) -> None:
+        """
+        Undo add_relation for the first relation equal to r, in O(degree).
+
+        Each list holds its relations in relation order, so dropping the
+        first equal one matches removing the first equal one from the
+        Structure's relation list.
+        """
+        _remove_from(self.out_edges, r.source, r)
+        _remove_from(self.in_edges, r.target, r)
+        _remove_from(self.incident, r.source, r)
+        _remove_from(self.incident, r.target, r)
+        _remove_from(self.incident_by_type, (r.source, r.type), r)
+        _remove_from(self.incident_by_type, (r.target, r.type), r)
+
+
+def _remove_from(lists: dict, key: Any, r: Relation) -> None:
+    edges = lists[key]
+    edges.remove(r)
+    if not edges:
+        del lists[key]
+
+
+class _StructureStats:
+    """
+    Running tallies behind has_feature, updated in O(1) by the Structure
+    builder methods.
+
+    Connectivity is a union-find over weakly connected components, built by
+    the first add_relation or connectivity query. It cannot undo a union, so
+    a removal drops it; later edits leave it dropped, so they stay O(1), and
+    only the next connectivity query rebuilds it. The cycle flag is None
+    when unknown and is recomputed on demand.
+    """
+
+    def __init__(self, entities: list[Entity], relations: list[Relation]) -> None:
+        self.n_entities = len(entities)
+        self.entity_types: Counter[str] = Counter(e.type for e in entities)
+        self.relation_types: Counter[str] = Counter(r.type for r in relations)
+        self.cycle: bool | None = None
+        self.parent: dict[str, str] | None = None
+        self.components = 0
+        self.dropped = False
+
+    def connect(self, entities: list[Entity], relations: list[Relation]) -> None:
+        """Build the union-find if it is stale."""
+        if self.parent is not None:
+            return
+        self.dropped = False
+        self.parent = {}
+        self.components = 0
+        for e in entities:
+            self.add_node(e.id)
+        for r in relations:
+            self.union(r.source, r.target)
+
+    def add_node(self, node: str) -> None:
+        if node not in self.parent:
+            self.parent[node] = node
+            self.components += 1
+
+    def find(self, node: str) -> str:
+        parent = self.parent
+        while parent[node] != node:
+            # Path halving
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, a: str, b: str) -> bool:
+        """Join the components of a and b; False if they were already one."""
+        self.add_node(a)
+        self.add_node(b)
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        self.parent[root_b] = root_a
+        self.components -= 1
+        return True
+
+    def drop(self) -> None:
+        """Forget the union-find after a removal until a connectivity query rebuilds it."""
+        self.parent = None
+        self.dropped = True
+
+    def discard_entity_type(self, entity_type: str) -> None:
+        _decrement(self.entity_types, entity_type)
+        self.n_entities -= 1
+
+    def discard_relation_type(self, relation_type: str) -> None:
+        _decrement(self.relation_types, relation_type)
+
+
+def _decrement(counts: Counter[str], key: str) -> None:
+    counts[key] -= 1
+    if not counts[key]:
+        del counts[key]
+
+
+def _field_state(obj: Any) -> dict[str, Any]:
+    """Pickle/copy state of a dataclass: its fields, without cached derived data."""
+    return {f.name: getattr(obj, f.name) for f in fields(obj)}
+
+
 @dataclass
 class Structure:
     """
@@ -47,23 +181,225 @@ class Structure:
 
     Entities are nodes, relations are edges. This captures *what is involved*
     in the problem without saying what needs to happen.
+
+    Lookups (entity, neighbors, out_relations, in_relations) go through an
+    index that is built lazily and rebuilt when the entity or relation lists
+    are replaced or change length. After editing list items in place, call
+    invalidate() so the index is rebuilt.
+
+    Structures built or edited through add_entity, add_relation,
+    remove_entity and remove_relation keep the index and the tallies behind
+    has_feature up to date as they go: additions cost O(1) amortized, and
+    removals cost the list removal plus O(degree) for the index.
     """
 
     entities: list[Entity] = field(default_factory=list)
     relations: list[Relation] = field(default_factory=list)
 
+    # Cached derived data: plain attributes with class-level defaults rather
+    # than dataclass fields, so fields(), asdict(), ==, repr, pickles and
+    # copies see only the graph. Each cache is valid while its key equals
+    # _state_key().
+    _version = 0
+    _index = None  # _StructureIndex
+    _index_key = ()
+    _hash = None  # canonical hash, cached by isomorphism.structure_hash
+    _hash_key = ()
+    _stats = None  # _StructureStats
+    _stats_key = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name in ("entities", "relations"):
+            # A replacement list can reuse the old one's address and length,
+            # so the version, not the list, tells caches it changed
+            self._version += 1
+
+    def __getstate__(self) -> dict[str, Any]:
+        return _field_state(self)
+
+    @property
+    def version(self) -> int:
+        """Counter bumped by invalidate(), the builder methods and list replacement."""
+        return self._version
+
+    def invalidate(self) -> None:
+        """Drop cached derived data after an in-place edit of entities or relations."""
+        self._version += 1
+        self._index = None
+        self._stats = None
+
+    def _state_key(self) -> tuple:
+        # Cheap fingerprint: catches explicit invalidation, list replacement and appends/removals
+        return self._version, len(self.entities), len(self.relations)
+
+    def _get_index(self) -> _StructureIndex:
+        key = self._state_key()
+        if self._index is None or self._index_key != key:
+            self._index = _StructureIndex(self.entities, self.relations)
+            self._index_key = key
+        return self._index
+
+    def _get_stats(self) -> _StructureStats:
+        key = self._state_key()
+        if self._stats is None or self._stats_key != key:
+            self._stats = _StructureStats(self.entities, self.relations)
+            self._stats_key = key
+        return self._stats
+
+    def _current_index(self) -> _StructureIndex | None:
+        """The index if it is up to date, else None (it will be rebuilt on demand)."""
+        if self._index is not None and self._index_key == self._state_key():
+            return self._index
+        return None
+
+    def _edited(self, index: _StructureIndex | None) -> None:
+        """Bump the version after a builder edit, keeping caches that were updated in step."""
+        self._version += 1
+        key = self._state_key()
+        self._index = index
+        self._index_key = key
+        self._stats_key = key
+
+    # -- builder API ---------------------------------------------------------
+
+    def add_entity(self, entity: Entity) -> None:
+        """Append an entity, updating the index and feature tallies incrementally."""
+        stats = self._get_stats()
+        index = self._current_index()
+        self.entities.append(entity)
+        stats.n_entities += 1
+        stats.entity_types[entity.type] += 1
+        if stats.parent is not None:
+            stats.add_node(entity.id)
+        if index is not None:
+            index.entities.setdefault(entity.id, entity)
+        self._edited(index)
+
+    def add_relation(self, relation: Relation) -> None:
+        """Append a relation, updating the index and feature tallies incrementally."""
+        stats = self._get_stats()
+        index = self._current_index()
+        if not stats.dropped:
+            stats.connect(self.entities, self.relations)
+        # Rebuilding a dropped union-find here would make every add after a
+        # removal O(n + m); without it the cycle flag is just forgotten
+        joined = stats.parent is not None and stats.union(relation.source, relation.target)
+        self.relations.append(relation)
+        stats.relation_types[relation.type] += 1
+        if stats.cycle is False and not joined:
+            # Within one component the new edge may close a directed cycle;
+            # an edge between components never does
+            stats.cycle = None
+        if index is not None:
+            index.add_relation(relation)
+        self._edited(index)
+
+    def remove_relation(self, relation: Relation) -> bool:
+        """Remove the first relation equal to relation; False if there is none."""
+        stats = self._get_stats()
+        index = self._current_index()
+        try:
+            self.relations.remove(relation)
+        except ValueError:
+            return False
+        stats.discard_relation_type(relation.type)
+        stats.drop()
+        if stats.cycle:
+            stats.cycle = None
+        if index is not None:
+            index.remove_relation(relation)
+        self._edited(index)
+        return True
+
+    def remove_entity(self, entity_id: str) -> bool:
+        """
+        Remove the entities with this id and every relation touching it;
+        False if there is no such entity.
+
+        The index and feature tallies are updated in O(degree), but the
+        entity and relation lists are rewritten, so this is O(n + m).
+        """
+        stats = self._get_stats()
+        index = self._current_index()
+        if index is not None and entity_id not in index.entities:
+            return False
+        removed = [e for e in self.entities if e.id == entity_id]
+        if not removed:
+            return False
+        self.entities[:] = [e for e in self.entities if e.id != entity_id]
+        for e in removed:
+            stats.discard_entity_type(e.type)
+        if index is not None:
+            # Every relation is in its source's out_edges and its target's
+            # in_edges; skip the in-edges already counted as self-loops
+            touching = index.out_edges.get(entity_id, []) + [
+                r for r in index.in_edges.get(entity_id, ()) if r.source != entity_id
+            ]
+        else:
+            touching = [r for r in self.relations if r.source == entity_id or r.target == entity_id]
+        if touching:
+            for r in touching:
+                stats.discard_relation_type(r.type)
+                if index is not None:
+                    index.remove_relation(r)
+            self.relations[:] = [
+                r for r in self.relations if r.source != entity_id and r.target != entity_id
+            ]
+            if stats.cycle:
+                stats.cycle = None
+        if index is not None:
+            del index.entities[entity_id]
+        stats.drop()
+        self._edited(index)
+        return True
+
+    # -- lookups ---------------------------------------------------------------
+
+    def is_connected(self) -> bool:
+        """True if the structure is one weakly connected component (or empty)."""
+        stats = self._get_stats()
+        stats.connect(self.entities, self.relations)
+        return stats.components <= 1
+
+    def components(self) -> list[list[str]]:
+        """
+        Weakly connected components as lists of entity ids, in first-seen
+        order over the entities and then the relations' endpoints.
+        """
+        stats = self._get_stats()
+        stats.connect(self.entities, self.relations)
+        # The union-find's insertion order depends on the edit history, so
+        # walk the lists instead
+        nodes = dict.fromkeys(e.id for e in self.entities)
+        for r in self.relations:
+            nodes[r.source] = nodes[r.target] = None
+        groups: dict[str, list[str]] = {}
+        for node in nodes:
+            groups.setdefault(stats.find(node), []).append(node)
+        return list(groups.values())
+
     def entity(self, entity_id: str) -> Entity | None:
-        return next((e for e in self.entities if e.id == entity_id), None)
+        return self._get_index().entities.get(entity_id)
 
     def neighbors(self, entity_id: str, relation_type: str | None = None) -> list[str]:
         """Get IDs of entities connected to entity_id, optionally filtered by relation type."""
-        results = []
-        for r in self.relations:
-            if r.source == entity_id and (relation_type is None or r.type == relation_type):
-                results.append(r.target)
-            if r.target == entity_id and (relation_type is None or r.type == relation_type):
-                results.append(r.source)
-        return results
+        index = self._get_index()
+        if relation_type is None:
+            edges = index.incident.get(entity_id, ())
+        else:
+            edges = index.incident_by_type.get((entity_id, relation_type), ())
+        return [r.target if r.source == entity_id else r.source for r in edges]
+
+    def out_relations(self, entity_id: str, relation_type: str | None = None) -> list[Relation]:
+        """Relations whose source is entity_id, optionally filtered by relation type."""
+        edges = self._get_index().out_edges.get(entity_id, ())
+        return [r for r in edges if relation_type is None or r.type == relation_type]
+
+    def in_relations(self, entity_id: str, relation_type: str | None = None) -> list[Relation]:
+        """Relations whose target is entity_id, optionally filtered by relation type."""
+        edges = self._get_index().in_edges.get(entity_id, ())
+        return [r for r in edges if relation_type is None or r.type == relation_type]
 
     @property
     def entity_types(self) -> set[str]:
@@ -88,42 +424,82 @@ class Structure:
     def _check_recursive(self) -> bool:
         # A structure is recursively decomposable if it contains entities of the same type
         # connected by containment relations
-        types = [e.type for e in self.entities]
-        return len(types) != len(set(types))
+        stats = self._get_stats()
+        return stats.n_entities != len(stats.entity_types)
 
     def _check_linear_chain(self) -> bool:
-        ordered = [r for r in self.relations if r.type == "ordered_before"]
-        return len(ordered) == len(self.entities) - 1
+        stats = self._get_stats()
+        return stats.relation_types["ordered_before"] == stats.n_entities - 1
 
     def _check_tree(self) -> bool:
-        contains = [r for r in self.relations if r.type == "contains"]
-        return len(contains) == len(self.entities) - 1
+        stats = self._get_stats()
+        return stats.relation_types["contains"] == stats.n_entities - 1
 
     def _check_cycle(self) -> bool:
         if not self.relations:
             return False
-        # Simple cycle detection via DFS
-        adj: dict[str, list[str]] = {e.id: [] for e in self.entities}
+        stats = self._get_stats()
+        if stats.cycle is None:
+            stats.cycle = self.find_cycle() is not None
+        return stats.cycle
+
+    def find_cycle(self) -> list[str] | None:
+        """
+        Find a directed cycle, returned as a closed path of entity ids
+        (first id repeated at the end), or None if the structure is acyclic.
+
+        Relations may reference ids missing from entities; those ids are
+        treated as nodes of the graph.
+        """
+        cycle, _ = self._walk()
+        return cycle
+
+    def topological_order(self) -> list[str] | None:
+        """Entity ids ordered so every relation points forward, or None if there is a cycle."""
+        cycle, postorder = self._walk()
+        if cycle is not None:
+            return None
+        postorder.reverse()
+        return postorder
+
+    def _walk(self) -> tuple[list[str] | None, list[str]]:
+        """Iterative DFS over directed relations: (first cycle found, postorder)."""
+        index = self._get_index()
+        out_edges = index.out_edges
+        nodes = dict.fromkeys(index.entities)
         for r in self.relations:
-            adj.setdefault(r.source, []).append(r.target)
-        visited: set[str] = set()
-        in_stack: set[str] = set()
-
-        def dfs(node: str) -> bool:
-            visited.add(node)
-            in_stack.add(node)
-            for neighbor in adj.get(node, []):
-                if neighbor in in_stack:
-                    return True
-                if neighbor not in visited and dfs(neighbor):
-                    return True
-            in_stack.discard(node)
-            return False
-
-        return any(dfs(e.id) for e in self.entities if e.id not in visited)
+            nodes.setdefault(r.source)
+            nodes.setdefault(r.target)
+
+        ON_PATH, DONE = 1, 2
+        state: dict[str, int] = {}
+        postorder: list[str] = []
+        for root in nodes:
+            if root in state:
+                continue
+            state[root] = ON_PATH
+            path = [root]
+            stack = [iter(out_edges.get(root, ()))]
+            while stack:
+                for r in stack[-1]:
+                    nxt = r.target
+                    seen = state.get(nxt)
+                    if seen is None:
+                        state[nxt] = ON_PATH
+                        path.append(nxt)
+                        stack.append(iter(out_edges.get(nxt, ())))
+                        break
+                    if seen == ON_PATH:
+                        return path[path.index(nxt):] + [nxt], postorder
+                else:
+                    stack.pop()
+                    node = path.pop()
+                    state[node] = DONE
+                    postorder.append(node)
+        return None, postorder
 
     def _check_bipartite(self) -> bool:
-        return len(self.entity_types) == 2
+        return len(self._get_stats().entity_types) == 2
 
 
 # ---------------------------------------------------------------------------
@@ -185,14 +561,51 @@ class Problem:
     goal: Goal | None = None
     tags: list[str] = field(default_factory=list)
 
+    # Memoized features as (structure, key, features): plain attributes, not
+    # dataclass fields (see Structure). The structure itself is kept and
+    # compared with `is`, since a replacement could reuse its id().
+    _features_cache = None
+    _match_features_cache = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        return _field_state(self)
+
     @property
     def structural_features(self) -> list[str]:
-        """Compute the abstract structural features of this problem."""
-        features = []
-        for feat in ["recursive_decomposability", "linear_chain", "tree", "cycle", "bipartite"]:
-            if self.structure.has_feature(feat):
-                features.append(feat)
-        return features
+        """
+        Compute the abstract structural features of this problem.
+
+        Memoized per structural version: the checks rerun only when the
+        structure is replaced, its lists change, or structure.invalidate()
+        is called.
+        """
+        structure = self.structure
+        key = structure._state_key()
+        cache = self._features_cache
+        if cache is None or cache[0] is not structure or cache[1] != key:
+            features = []
+            for feat in STRUCTURAL_FEATURES:
+                if structure.has_feature(feat):
+                    features.append(feat)
+            cache = self._features_cache = (structure, key, features)
+        return list(cache[2])
+
+    @property
+    def match_features(self) -> frozenset[str]:
+        """Structural features plus tags: what solution preconditions are matched against."""
+        structure = self.structure
+        key = (structure._state_key(), tuple(self.tags))
+        cache = self._match_features_cache
+        if cache is None or cache[0] is not structure or cache[1] != key:
+            features = frozenset(self.structural_features).union(self.tags)
+            cache = self._match_features_cache = (structure, key, features)
+        return cache[2]
+
+    def invalidate(self) -> None:
+        """Drop cached features after editing the structure in place."""
+        self.structure.invalidate()
+        self._features_cache = None
+        self._match_features_cache = None
 
 
 # ---------------------------------------------------------------------------
@@ -264,10 +677,7 @@ class Solution:
 
     def matches(self, problem: Problem) -> bool:
         """Check if this solution's preconditions match the problem's structure."""
-        problem_features = set(problem.structural_features)
-        problem_features.update(problem.tags)
-        required = set(self.preconditions)
-        return required.issubset(problem_features)
+        return problem.match_features.issuperset(self.preconditions)
 
 
 # ---------------------------------------------------------------------------
@@ -320,9 +730,30 @@ class Pattern:
     related_patterns: list[str] = field(default_factory=list)
     tags: list[str] = field(default_factory=list)
 
+    # Stores holding this pattern, notified so they can keep their domain
+    # index current. A WeakSet created on the first store.add; like the
+    # Structure caches, a plain attribute rather than a dataclass field.
+    _stores = None
+
     def add_instantiation(self, inst: Instantiation) -> None:
         """Record a new concrete instance of this pattern."""
         self.instantiations.append(inst)
+        if self._stores:
+            for store in list(self._stores):
+                store._instantiation_added(self, inst)
+
+    def _attach(self, store: Any) -> None:
+        if self._stores is None:
+            self._stores = weakref.WeakSet()
+        self._stores.add(store)
+
+    def _detach(self, store: Any) -> None:
+        if self._stores is not None:
+            self._stores.discard(store)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Store membership is not part of a pattern's value (and is not picklable)
+        return _field_state(self)
 
     @property
     def domains_covered(self) -> set[str]:
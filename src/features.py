@@ -0,0 +1,78 @@
+"""
+Feature vocabulary: interning of feature names to bit positions.
+
+Preconditions, tags and structural features are small string vocabularies.
+Interning them lets a feature set be held as a single int bitmask, so set
+operations become integer operations:
+
+    |A ∩ B| = popcount(mask(A) & mask(B))
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+
+class FeatureVocabulary:
+    """
+    A registry assigning each feature name a stable bit position.
+
+    Positions are never reused, so masks built earlier stay valid as the
+    vocabulary grows.
+    """
+
+    def __init__(self) -> None:
+        self._bits: dict[str, int] = {}
+        self._names: list[str] = []
+
+    def intern(self, feature: str) -> int:
+        """Return the bit position of a feature, assigning a new one if needed."""
+        bit = self._bits.get(feature)
+        if bit is None:
+            bit = len(self._names)
+            self._bits[feature] = bit
+            self._names.append(feature)
+        return bit
+
+    def bit(self, feature: str) -> int | None:
+        """Bit position of a known feature, or None."""
+        return self._bits.get(feature)
+
+    def mask(self, features: Iterable[str]) -> int:
+        """Encode features as a bitmask, interning any that are new."""
+        mask = 0
+        for feature in features:
+            mask |= 1 << self.intern(feature)
+        return mask
+
+    def lookup_mask(self, features: Iterable[str]) -> int:
+        """Encode features as a bitmask, ignoring (not interning) unknown ones."""
+        bits = self._bits
+        mask = 0
+        for feature in features:
+            bit = bits.get(feature)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def names(self, mask: int) -> list[str]:
+        """Decode a bitmask into its sorted feature names."""
+        names = []
+        while mask:
+            low = mask & -mask
+            names.append(self._names[low.bit_length() - 1])
+            mask ^= low
+        names.sort()
+        return names
+
+    def name(self, bit: int) -> str:
+        return self._names[bit]
+
+    def __contains__(self, feature: object) -> bool:
+        return feature in self._bits
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __repr__(self) -> str:
+        return f"FeatureVocabulary({len(self)} features)"
@@ -0,0 +1,288 @@
+"""
+Structural matching: typed subgraph isomorphism between Structures.
+
+theory/foundations.md treats two problems as the same when their
+structures are isomorphic. This module decides that directly on the
+entity/relation graph:
+
+    find_embedding(P, T)  an injective map of P's entities into T's that
+                          preserves entity types and every typed relation
+                          (subgraph monomorphism, VF2-style search)
+    is_isomorphic(A, B)   an embedding that is also a bijection on
+                          entities and on distinct relations
+    structure_hash(S)     a Weisfeiler-Lehman hash: equal for isomorphic
+                          structures, whatever their entity ids
+
+The search orders pattern entities so each one is adjacent to those
+already mapped (as in VF2++), draws candidates from the neighbours of
+mapped entities, and prunes with per-entity type/degree signatures. A
+per-structure StructureSignature (type and degree counts) rejects most
+non-matching pairs before any search.
+
+Relations are compared as distinct (source, target, type) triples; ids
+that appear only in relations are entities of type None.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterator
+
+from .core import Structure
+
+# WL refinement rounds behind structure_hash. Refining until the partition
+# is stable can take O(n) rounds (about n/2 on a chain), so it stops here.
+HASH_ROUNDS = 3
+
+
+@dataclass(frozen=True)
+class StructureSignature:
+    """
+    Isomorphism-invariant counts of a structure.
+
+    If P embeds in T then T's signature covers P's, so covers() is a cheap
+    necessary condition checked before searching.
+    """
+
+    n_entities: int
+    n_relations: int
+    entity_types: tuple[tuple[str | None, int], ...]
+    relation_types: tuple[tuple[str, int], ...]
+    max_out_degree: int
+    max_in_degree: int
+
+    def covers(self, other: StructureSignature) -> bool:
+        """True if a structure with this signature could contain one with other's."""
+        if (
+            other.n_entities > self.n_entities
+            or other.n_relations > self.n_relations
+            or other.max_out_degree > self.max_out_degree
+            or other.max_in_degree > self.max_in_degree
+        ):
+            return False
+        mine = dict(self.entity_types)
+        if any(mine.get(t, 0) < n for t, n in other.entity_types):
+            return False
+        mine_rel = dict(self.relation_types)
+        return all(mine_rel.get(t, 0) >= n for t, n in other.relation_types)
+
+
+class StructureGraph:
+    """A Structure compiled for matching: typed adjacency sets and signatures."""
+
+    def __init__(self, structure: Structure) -> None:
+        self.types: dict[str, str | None] = {e.id: e.type for e in structure.entities}
+        edges = {(r.source, r.target, r.type) for r in structure.relations}
+        for source, target, _ in edges:
+            self.types.setdefault(source, None)
+            self.types.setdefault(target, None)
+
+        self.edges = edges
+        self.out: dict[str, dict[str, set[str]]] = {n: {} for n in self.types}
+        self.inn: dict[str, dict[str, set[str]]] = {n: {} for n in self.types}
+        # node → all neighbours regardless of direction/type, for ordering
+        self.adjacent: dict[str, set[str]] = {n: set() for n in self.types}
+        for source, target, rel_type in edges:
+            self.out[source].setdefault(rel_type, set()).add(target)
+            self.inn[target].setdefault(rel_type, set()).add(source)
+            self.adjacent[source].add(target)
+            self.adjacent[target].add(source)
+
+        # Per-node degree by (direction, relation type): a candidate must dominate it
+        self.degrees: dict[str, Counter] = {}
+        for n in self.types:
+            deg: Counter = Counter()
+            for rel_type, targets in self.out[n].items():
+                deg["out", rel_type] = len(targets)
+            for rel_type, sources in self.inn[n].items():
+                deg["in", rel_type] = len(sources)
+            self.degrees[n] = deg
+
+        self.by_type: dict[str | None, list[str]] = {}
+        for n, t in self.types.items():
+            self.by_type.setdefault(t, []).append(n)
+
+        self.signature = StructureSignature(
+            n_entities=len(self.types),
+            n_relations=len(edges),
+            entity_types=tuple(sorted(Counter(self.types.values()).items(), key=_type_key)),
+            relation_types=tuple(sorted(Counter(t for _, _, t in edges).items())),
+            max_out_degree=max((sum(len(s) for s in d.values()) for d in self.out.values()), default=0),
+            max_in_degree=max((sum(len(s) for s in d.values()) for d in self.inn.values()), default=0),
+        )
+
+
+def _type_key(item: tuple[str | None, int]) -> tuple[bool, str]:
+    t = item[0]
+    return t is not None, t or ""
+
+
+def find_embedding(
+    pattern: Structure | StructureGraph,
+    target: Structure | StructureGraph,
+) -> dict[str, str] | None:
+    """
+    Map pattern entity ids to target entity ids so that types and every
+    pattern relation are preserved, or return None if no such map exists.
+    """
+    p = pattern if isinstance(pattern, StructureGraph) else StructureGraph(pattern)
+    t = target if isinstance(target, StructureGraph) else StructureGraph(target)
+    if not t.signature.covers(p.signature):
+        return None
+    return _search(p, t)
+
+
+def is_isomorphic(a: Structure | StructureGraph, b: Structure | StructureGraph) -> bool:
+    """True if the structures are identical up to renaming entity ids."""
+    ga = a if isinstance(a, StructureGraph) else StructureGraph(a)
+    gb = b if isinstance(b, StructureGraph) else StructureGraph(b)
+    if ga.signature != gb.signature:
+        return False
+    # Equal entity and relation counts turn a monomorphism into an isomorphism
+    return _search(ga, gb) is not None
+
+
+def structure_hash(structure: Structure | StructureGraph) -> str:
+    """
+    Canonical hash of a structure over entity types and relation types.
+
+    Entity colours start as their types and are refined Weisfeiler-Lehman
+    style from the colours of their typed in- and out-neighbours, for at
+    most HASH_ROUNDS rounds (fewer if the colour classes stop splitting);
+    the hash digests the final colour multiset, so it costs
+    O(HASH_ROUNDS · (n + m)) digests. Isomorphic structures always hash
+    equal, and different hashes prove non-isomorphism. Equal hashes only
+    mean the structures agree on every neighbourhood of radius
+    HASH_ROUNDS: structures that differ only further out (such as long
+    chains) can collide, so confirm with is_isomorphic where that matters,
+    as find_by_structure and dedup do.
+
+    The hash of a Structure is cached on it until the structure changes.
+    """
+    if isinstance(structure, StructureGraph):
+        return _wl_hash(structure)
+    key = structure._state_key()
+    if structure._hash is None or structure._hash_key != key:
+        structure._hash = _wl_hash(StructureGraph(structure))
+        structure._hash_key = key
+    return structure._hash
+
+
+def _digest(value: object) -> str:
+    return hashlib.blake2b(repr(value).encode(), digest_size=16).hexdigest()
+
+
+def _wl_hash(g: StructureGraph) -> str:
+    colors = {n: _digest(t) for n, t in g.types.items()}
+    classes = len(set(colors.values()))
+    for _ in range(HASH_ROUNDS):
+        colors = _refine(g, colors)
+        refined = len(set(colors.values()))
+        if refined == classes:
+            # Stable partition: isomorphic structures stop after the same round
+            break
+        classes = refined
+    return _digest((sorted(colors.values()), len(g.edges)))
+
+
+def _refine(g: StructureGraph, colors: dict[str, str]) -> dict[str, str]:
+    """One WL round: recolour each entity from its colour and its typed neighbours' colours."""
+    return {
+        n: _digest((
+            colors[n],
+            sorted(
+                [("out", rel_type, colors[m]) for rel_type, ms in g.out[n].items() for m in ms]
+                + [("in", rel_type, colors[m]) for rel_type, ms in g.inn[n].items() for m in ms]
+            ),
+        ))
+        for n in colors
+    }
+
+
+def _match_order(p: StructureGraph) -> list[str]:
+    """Pattern nodes ordered so each is adjacent to earlier ones where possible."""
+    order: list[str] = []
+    placed: set[str] = set()
+    remaining = set(p.types)
+    while remaining:
+        # Start each component at its most connected node
+        root = max(remaining, key=lambda n: (len(p.adjacent[n]), n))
+        frontier = {root}
+        while frontier:
+            # Most links back into the placed set first, then highest degree
+            node = max(
+                frontier,
+                key=lambda n: (len(p.adjacent[n] & placed), len(p.adjacent[n]), n),
+            )
+            frontier.discard(node)
+            order.append(node)
+            placed.add(node)
+            remaining.discard(node)
+            frontier |= p.adjacent[node] & remaining
+    return order
+
+
+def _search(p: StructureGraph, t: StructureGraph) -> dict[str, str] | None:
+    order = _match_order(p)
+    mapping: dict[str, str] = {}
+    used: set[str] = set()
+
+    def candidates(u: str) -> list[str] | set[str]:
+        # Follow an edge from an already mapped neighbour when there is one
+        for rel_type, targets in p.inn[u].items():
+            for w in targets:
+                if w in mapping:
+                    return t.out[mapping[w]].get(rel_type, set())
+        for rel_type, sources in p.out[u].items():
+            for w in sources:
+                if w in mapping:
+                    return t.inn[mapping[w]].get(rel_type, set())
+        return t.by_type.get(p.types[u], [])
+
+    def feasible(u: str, v: str) -> bool:
+        if v in used or t.types[v] != p.types[u]:
+            return False
+        t_deg = t.degrees[v]
+        if any(t_deg[key] < n for key, n in p.degrees[u].items()):
+            return False
+        for rel_type, targets in p.out[u].items():
+            t_targets = t.out[v].get(rel_type, ())
+            for w in targets:
+                if w in mapping and mapping[w] not in t_targets:
+                    return False
+                if w == u and v not in t_targets:
+                    return False
+        for rel_type, sources in p.inn[u].items():
+            t_sources = t.inn[v].get(rel_type, ())
+            for w in sources:
+                if w in mapping and mapping[w] not in t_sources:
+                    return False
+        return True
+
+    def options(u: str) -> Iterator[str]:
+        cands = candidates(u)
+        return iter(sorted(cands) if isinstance(cands, set) else cands)
+
+    if not order:
+        return {}
+    # Explicit-stack backtracking: one candidate iterator per matched depth
+    stack = [options(order[0])]
+    while stack:
+        depth = len(stack) - 1
+        u = order[depth]
+        if u in mapping:
+            used.discard(mapping.pop(u))
+        for v in stack[-1]:
+            if feasible(u, v):
+                mapping[u] = v
+                used.add(v)
+                break
+        else:
+            stack.pop()
+            continue
+        if depth + 1 == len(order):
+            return dict(mapping)
+        stack.append(options(order[depth + 1]))
+    return None
@@ -0,0 +1,131 @@
+"""
+Memory-mapped, read-only PatternStore over a binary store file.
+
+Opening the store reads only the header, string table and index of a file
+written by PatternStore.save_binary(). Pattern records stay in the mapped
+file and are decoded on demand, so startup cost is independent of record
+size and resident memory follows the working set.
+"""
+
+from __future__ import annotations
+
+import mmap
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+
+from . import binary
+from .core import Pattern
+from .scoring import Scorer
+from .store import PatternStore
+
+
+class _LazyPatterns(Mapping):
+    """Pattern id → Pattern view that decodes records from the mapped file on access."""
+
+    def __init__(
+        self,
+        data: mmap.mmap,
+        strings: list[str],
+        locations: dict[str, tuple[int, int]],
+        cache_size: int,
+    ) -> None:
+        self._data = data
+        self._strings = strings
+        self._locations = locations
+        self._cache: OrderedDict[str, Pattern] = OrderedDict()
+        self._cache_size = cache_size
+
+    def __getitem__(self, pattern_id: str) -> Pattern:
+        pattern = self._cache.get(pattern_id)
+        if pattern is not None:
+            self._cache.move_to_end(pattern_id)
+            return pattern
+        offset, length = self._locations[pattern_id]
+        pattern = binary.decode_record(self._data[offset:offset + length], self._strings)
+        if self._cache_size > 0:
+            self._cache[pattern_id] = pattern
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return pattern
+
+    def __contains__(self, pattern_id: object) -> bool:
+        return pattern_id in self._locations
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._locations)
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+
+class MappedPatternStore(PatternStore):
+    """
+    A read-only PatternStore backed by an mmap'd binary store file.
+
+    match, search_by_tag and search_by_domain run against indexes built from
+    the file's index and decode only the patterns they return. Decoded patterns are kept in
+    an LRU cache of cache_size entries. Patterns returned by this store are
+    snapshots; editing them does not change the file.
+
+    Usage:
+        with MappedPatternStore("patterns.apsb") as store:
+            best = store.best_match(problem)
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        cache_size: int = 1024,
+        vectorized: bool = False,
+        scorer: Scorer | None = None,
+    ) -> None:
+        super().__init__(vectorized=vectorized, scorer=scorer)
+        self.path = Path(path)
+        with open(self.path, "rb") as fp:
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = binary.read_header(self._mmap)
+        strings = binary.read_block(self._mmap, header.strings_offset)
+        locations: dict[str, tuple[int, int]] = {}
+        for entry in binary.read_index(self._mmap, header, strings):
+            locations[entry.pattern_id] = (entry.offset, entry.length)
+            self._assign_seq(entry.pattern_id)
+            self._index_keys(
+                entry.pattern_id,
+                entry.preconditions,
+                entry.tags,
+                entry.domains,
+                entry.goal_type,
+                entry.composition_type,
+            )
+
+        self._patterns = _LazyPatterns(self._mmap, strings, locations, cache_size)
+
+    def add(self, pattern: Pattern) -> None:
+        raise TypeError("MappedPatternStore is read-only")
+
+    def remove(self, pattern_id: str) -> bool:
+        raise TypeError("MappedPatternStore is read-only")
+
+    def dedup(self) -> int:
+        raise TypeError("MappedPatternStore is read-only")
+
+    def load(self, *args, **kwargs) -> None:
+        raise TypeError("MappedPatternStore is read-only")
+
+    def load_binary(self, *args, **kwargs) -> None:
+        raise TypeError("MappedPatternStore is read-only")
+
+    def close(self) -> None:
+        """Unmap the file. Patterns already returned stay usable."""
+        self._mmap.close()
+
+    def __enter__(self) -> MappedPatternStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"MappedPatternStore({len(self)} patterns, {self.path.name})"
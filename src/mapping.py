@@ -10,8 +10,13 @@ and abstract problem representations.
 
 from __future__ import annotations
 
+import itertools
+import json
+import sys
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
 
 from .core import (
     Constraint,
@@ -29,12 +34,44 @@ from .core import (
 )
 
 
+# Stamps of derived maps, so a rebuilt map never reuses an old one's stamp
+_builds = itertools.count(1)
+
+
+class _Derived:
+    """A map derived from a source dict, with the snapshot it was built from."""
+
+    def __init__(self, source: dict[str, str], value: dict[str, Any]) -> None:
+        self.source = source
+        self.snapshot = dict(source)
+        # Inverting an injective map does not depend on key order
+        self.injective = len(set(source.values())) == len(source)
+        self.value = value
+        self.stamp = next(_builds)
+
+    def is_current(self, source: dict[str, str]) -> bool:
+        """True if source is the same dict, with the same items, as at build time."""
+        if source is not self.source or source != self.snapshot:
+            return False
+        return self.injective or list(source) == list(self.snapshot)
+
+
 @dataclass
 class DomainMapping:
     """
     A bidirectional mapping between a concrete domain and abstract types.
 
     Acts as both the abstraction functor F and instantiation functor G.
+
+    type_map and operation_map may be edited in place or reassigned. Derived
+    inverse maps are cached with a snapshot of the map they came from and
+    rebuilt only when it no longer matches, so an unchanged map costs a
+    dict comparison rather than a rebuild; each access returns a fresh
+    dict. When a map is not injective (several concrete names map to one
+    abstract name), the inverse keeps the last concrete name, as dict
+    inversion always has; the full many-to-one picture is available from
+    type_preimages / operation_preimages and ambiguous_types /
+    ambiguous_operations.
     """
 
     domain: str
@@ -48,15 +85,92 @@ class DomainMapping:
     # Domain-specific axioms and constraints
     axioms: dict[str, Any] = field(default_factory=dict)
 
+    def __post_init__(self) -> None:
+        # Derived maps and the compiled form: plain attributes rather than
+        # dataclass fields, so ==, repr, asdict() and pickles see only the
+        # mapping itself
+        self._cache: dict[str, _Derived] = {}
+        self._compiled: CompiledMapping | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_cache"], state["_compiled"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.__post_init__()
+
+    def _derived(
+        self,
+        name: str,
+        source: dict[str, str],
+        build: Callable[[dict[str, str]], dict[str, Any]],
+    ) -> _Derived:
+        entry = self._cache.get(name)
+        if entry is None or not entry.is_current(source):
+            entry = self._cache[name] = _Derived(source, build(source))
+        return entry
+
+    def _inverse_operations(self) -> _Derived:
+        return self._derived("inverse_operation_map", self.operation_map, _invert)
+
     @property
     def inverse_type_map(self) -> dict[str, str]:
         """Abstract type → concrete type (for instantiation)."""
-        return {v: k for k, v in self.type_map.items()}
+        return dict(self._derived("inverse_type_map", self.type_map, _invert).value)
 
     @property
     def inverse_operation_map(self) -> dict[str, str]:
         """Abstract operation → concrete operation (for instantiation)."""
-        return {v: k for k, v in self.operation_map.items()}
+        return dict(self._inverse_operations().value)
+
+    @property
+    def type_preimages(self) -> dict[str, tuple[str, ...]]:
+        """Abstract type → every concrete type mapped to it, in map order."""
+        return dict(self._derived("type_preimages", self.type_map, _preimages).value)
+
+    @property
+    def operation_preimages(self) -> dict[str, tuple[str, ...]]:
+        """Abstract operation → every concrete operation mapped to it, in map order."""
+        return dict(self._derived("operation_preimages", self.operation_map, _preimages).value)
+
+    @property
+    def ambiguous_types(self) -> dict[str, tuple[str, ...]]:
+        """Abstract types reached from more than one concrete type."""
+        return {k: v for k, v in self.type_preimages.items() if len(v) > 1}
+
+    @property
+    def ambiguous_operations(self) -> dict[str, tuple[str, ...]]:
+        """Abstract operations reached from more than one concrete operation."""
+        return {k: v for k, v in self.operation_preimages.items() if len(v) > 1}
+
+    @property
+    def is_injective(self) -> bool:
+        """True if both maps invert without losing a concrete name."""
+        return not self.ambiguous_types and not self.ambiguous_operations
+
+    def compile(self, maxsize: int = 1024) -> CompiledMapping:
+        """
+        The compiled form of this mapping, for fast repeated instantiation.
+
+        Returns the same CompiledMapping on every call (unless maxsize
+        changes), so its template cache is shared by all callers.
+        """
+        if self._compiled is None or self._compiled.maxsize != maxsize:
+            self._compiled = CompiledMapping(self, maxsize)
+        return self._compiled
+
+
+def _invert(mapping: dict[str, str]) -> dict[str, str]:
+    return {v: k for k, v in mapping.items()}
+
+
+def _preimages(mapping: dict[str, str]) -> dict[str, tuple[str, ...]]:
+    grouped: dict[str, list[str]] = {}
+    for k, v in mapping.items():
+        grouped.setdefault(v, []).append(k)
+    return {v: tuple(ks) for v, ks in grouped.items()}
 
 
 def abstract(problem_desc: dict[str, Any], mapping: DomainMapping) -> Problem:
@@ -78,10 +192,66 @@ def abstract(problem_desc: dict[str, Any], mapping: DomainMapping) -> Problem:
     Returns:
         An abstract Problem with concrete types mapped to abstract types.
     """
+    type_map = mapping.type_map
+    return _abstract_one(problem_desc, lambda t: type_map.get(t, t))
+
+
+def abstract_many(
+    problem_descs: Iterable[dict[str, Any]],
+    mapping: DomainMapping,
+) -> Iterator[Problem]:
+    """
+    Apply the abstraction functor F lazily to a stream of descriptions.
+
+    Descriptions are consumed one at a time, so the input can be a
+    generator over a large feed (see read_jsonl). Type lookups go through a
+    per-call table that resolves each distinct concrete type once and
+    interns the abstract type string, so repeated types share one object.
+    The mapping is snapshotted when iteration starts.
+
+    Args:
+        problem_descs: Concrete problem descriptions (same keys as abstract())
+        mapping: DomainMapping for the concrete domain
+
+    Yields:
+        One abstract Problem per description, in input order.
+    """
+    type_map = dict(mapping.type_map)
+    resolved: dict[str, str] = {}
+
+    def resolve(concrete: str) -> str:
+        abstract_type = resolved.get(concrete)
+        if abstract_type is None:
+            abstract_type = sys.intern(type_map.get(concrete, concrete))
+            resolved[concrete] = abstract_type
+        return abstract_type
+
+    for problem_desc in problem_descs:
+        yield _abstract_one(problem_desc, resolve)
+
+
+def read_jsonl(path: str | Path) -> Iterator[dict[str, Any]]:
+    """
+    Read problem descriptions from a JSON Lines file, one object per line.
+
+    Lines are decoded as they are read; blank lines are skipped.
+    """
+    with open(path, encoding="utf-8") as fp:
+        for lineno, line in enumerate(fp, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{lineno}: invalid JSON: {e.msg}") from e
+
+
+def _abstract_one(problem_desc: dict[str, Any], resolve: Callable[[str], str]) -> Problem:
+    """Build an abstract Problem, mapping entity/relation types through resolve."""
     # Map concrete entity types to abstract types
     entities = []
     for e in problem_desc.get("entities", []):
-        abstract_type = mapping.type_map.get(e["type"], e["type"])
+        abstract_type = resolve(e["type"])
         entities.append(Entity(
             id=e["id"],
             type=abstract_type,
@@ -91,7 +261,7 @@ def abstract(problem_desc: dict[str, Any], mapping: DomainMapping) -> Problem:
     # Map concrete relation types to abstract types
     relations = []
     for r in problem_desc.get("relations", []):
-        abstract_type = mapping.type_map.get(r["type"], r["type"])
+        abstract_type = resolve(r["type"])
         relations.append(Relation(
             source=r["source"],
             target=r["target"],
@@ -145,7 +315,14 @@ def instantiate(
     Returns:
         A list of concrete step descriptions.
     """
-    inv_ops = mapping.inverse_operation_map
+    return _concrete_steps(solution, mapping._inverse_operations().value, mapping.domain)
+
+
+def _concrete_steps(
+    solution: Solution,
+    inv_ops: dict[str, str],
+    domain: str,
+) -> list[dict[str, Any]]:
     concrete_steps = []
 
     for step in solution.transformation.steps:
@@ -156,7 +333,65 @@ def instantiate(
             "args": step.args,
             "binds": step.binds,
             "rationale": step.rationale,
-            "domain": mapping.domain,
+            "domain": domain,
         })
 
     return concrete_steps
+
+
+class CompiledMapping:
+    """
+    A DomainMapping prepared for repeated instantiation.
+
+    Concrete step templates are computed once per solution and kept in an
+    LRU cache keyed by solution id, mapping domain and the version of the
+    mapping's inverse operation map (the only map templates depend on), so
+    instantiating the same solution again is a lookup. Editing or
+    reassigning operation_map gives the inverse a new version, so stale
+    templates are never returned; solutions are identified by id, so give
+    changed solutions a new id (or call clear()).
+
+    Obtain one with DomainMapping.compile().
+    """
+
+    def __init__(self, mapping: DomainMapping, maxsize: int = 1024) -> None:
+        self.mapping = mapping
+        self.maxsize = maxsize
+        self._templates: OrderedDict[tuple[str, str, int], list[dict[str, Any]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def instantiate(self, solution: Solution) -> list[dict[str, Any]]:
+        """
+        Same result as instantiate(solution, mapping).
+
+        Each call returns fresh step dicts, so callers may modify them
+        without affecting the cache.
+        """
+        mapping = self.mapping
+        inverse = mapping._inverse_operations()
+        key = (solution.id, mapping.domain, inverse.stamp)
+        templates = self._templates.get(key)
+        if templates is not None:
+            self._templates.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            templates = _concrete_steps(solution, inverse.value, mapping.domain)
+            if self.maxsize > 0:
+                self._templates[key] = templates
+                if len(self._templates) > self.maxsize:
+                    self._templates.popitem(last=False)
+        return [dict(t) for t in templates]
+
+    def clear(self) -> None:
+        self._templates.clear()
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def __repr__(self) -> str:
+        return (
+            f"CompiledMapping({self.mapping.domain!r}, {len(self)}/{self.maxsize} cached, "
+            f"{self.hits} hits, {self.misses} misses)"
+        )
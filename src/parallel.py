@@ -0,0 +1,160 @@
+"""
+Sharded, multi-process matching for very large pattern stores.
+
+Pure-Python scoring in PatternStore.match holds the GIL. ShardedMatcher
+partitions the store's conditional patterns into shards and gives each
+shard its own single-process executor. A shard is sent to its worker once,
+as that process's initializer argument, and stays resident there. A query
+only ships the problem's feature bitmask, and each worker returns its own
+top-k, which the parent merges.
+
+Shards are (pattern id, precondition bitmask, precondition count) triples,
+so workers need neither Pattern objects nor the store's vocabulary.
+Changing the store makes the matcher re-shard on the next query, which
+restarts the workers. The mode pays off for large stores that change
+rarely; see benchmarks/bench_parallel.py for the crossover size.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable
+
+from .core import Problem
+from .store import MatchResult, PatternStore, _rank
+
+# Worker-process state, set once by _load_shard
+_shard_masks: dict[str, tuple[int, int]] = {}
+_shard_postings: dict[int, list[str]] = {}
+
+
+def _load_shard(shard: list[tuple[str, int, int]]) -> None:
+    """Worker initializer: keep the shard and a bit → pattern ids index resident."""
+    global _shard_masks, _shard_postings
+    _shard_masks = {pattern_id: (mask, size) for pattern_id, mask, size in shard}
+    _shard_postings = {}
+    for pattern_id, mask, _size in shard:
+        while mask:
+            low = mask & -mask
+            _shard_postings.setdefault(low.bit_length() - 1, []).append(pattern_id)
+            mask ^= low
+
+
+def _score_shard(problem_mask: int, threshold: float, top_k: int | None) -> list[tuple[float, str]]:
+    """Worker task: (score, pattern_id) pairs of the resident shard, best first."""
+    if threshold <= 0:
+        candidate_ids: Iterable[str] = _shard_masks
+    else:
+        candidate_ids = set()
+        mask = problem_mask
+        while mask:
+            low = mask & -mask
+            candidate_ids.update(_shard_postings.get(low.bit_length() - 1, ()))
+            mask ^= low
+
+    def scored():
+        for pattern_id in candidate_ids:
+            pattern_mask, size = _shard_masks[pattern_id]
+            score = (pattern_mask & problem_mask).bit_count() / size
+            if score >= threshold:
+                yield score, pattern_id
+
+    if top_k is None:
+        return sorted(scored(), key=_rank)
+    return heapq.nsmallest(top_k, scored(), key=_rank)
+
+
+class ShardedMatcher:
+    """
+    Opt-in parallel match() over a PatternStore.
+
+    Results are identical to store.match(). Patterns without preconditions
+    are scored in the parent, because their score is constant. Workers only
+    compute Overlap scores, so a store with a weighted scorer (see
+    scoring.py) is matched in-process instead.
+
+    Usage:
+        with ShardedMatcher(store, workers=8) as matcher:
+            results = matcher.match(problem, top_k=10)
+    """
+
+    def __init__(self, store: PatternStore, workers: int | None = None) -> None:
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self._executors: list[ProcessPoolExecutor] = []
+        self._version = -1
+
+    def _ensure_shards(self) -> None:
+        if self._executors and self._version == self.store._version:
+            return
+        self._shutdown()
+        masks = self.store._masks
+        sizes = self.store._sizes
+        shards: list[list[tuple[str, int, int]]] = [[] for _ in range(self.workers)]
+        for i, pattern_id in enumerate(masks):
+            shards[i % self.workers].append((pattern_id, masks[pattern_id], sizes[pattern_id]))
+        self._executors = [
+            ProcessPoolExecutor(max_workers=1, initializer=_load_shard, initargs=(shard,))
+            for shard in shards
+            if shard
+        ]
+        self._version = self.store._version
+
+    def match(
+        self,
+        problem: Problem,
+        threshold: float = 0.5,
+        top_k: int | None = None,
+    ) -> list[MatchResult]:
+        """Same contract as PatternStore.match, with conditional patterns scored in parallel."""
+        return self.match_many([problem], threshold, top_k)[0]
+
+    def match_many(
+        self,
+        problems: Iterable[Problem],
+        threshold: float = 0.5,
+        top_k: int | None = None,
+    ) -> list[list[MatchResult]]:
+        """Match a batch; all queries are in flight on every shard at once."""
+        if self.store.scorer.weighted:
+            return self.store.match_many(problems, threshold, top_k)
+        self._ensure_shards()
+        store = self.store
+        masks = [store._vocabulary.lookup_mask(p.match_features) for p in problems]
+        unique = list(dict.fromkeys(masks))
+        futures = {
+            mask: [ex.submit(_score_shard, mask, threshold, top_k) for ex in self._executors]
+            for mask in unique
+        }
+
+        computed: dict[int, list[MatchResult]] = {}
+        for mask in unique:
+            weak = ((0.1, pattern_id) for pattern_id in store._unconditional)
+            merged = itertools.chain(weak, *(f.result() for f in futures[mask]))
+            if top_k is None:
+                ranked = sorted(merged, key=_rank)
+            else:
+                ranked = heapq.nsmallest(top_k, merged, key=_rank)
+            computed[mask] = [store._result(pattern_id, score, mask) for score, pattern_id in ranked]
+        return [list(computed[mask]) for mask in masks]
+
+    def _shutdown(self) -> None:
+        for executor in self._executors:
+            executor.shutdown(cancel_futures=True)
+        self._executors = []
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self._shutdown()
+
+    def __enter__(self) -> ShardedMatcher:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"ShardedMatcher({self.store!r}, {self.workers} workers)"
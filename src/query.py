@@ -0,0 +1,405 @@
+"""
+Boolean queries over a PatternStore's indexes.
+
+Queries combine index lookups with AND/OR/NOT:
+
+    q = HasTag("graph") & (InDomain("compilers") | ~GoalTypeIs(GoalType.FIND))
+    store.query(q)
+
+or the equivalent text form:
+
+    store.query('tag:graph AND (domain:compilers OR NOT goal:find)')
+
+Text terms are field:value with fields tag, domain, pre (precondition),
+goal and composition. Values may be double-quoted; adjacent terms are
+ANDed; NOT binds tightest, then AND, then OR.
+
+A query is compiled to a plan before it runs. Every leaf is a posting
+list of known size, so the planner can drive each AND from its most
+selective operand and apply the others as filters over that candidate
+set, instead of materializing every operand.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable
+
+from .core import CompositionType, GoalType
+
+if TYPE_CHECKING:
+    from .store import PatternStore
+
+
+# ---------------------------------------------------------------------------
+# Query AST
+# ---------------------------------------------------------------------------
+
+
+class Query:
+    """Base class for query expressions; supports &, | and ~."""
+
+    def __and__(self, other: Query) -> Query:
+        return And(self, other)
+
+    def __or__(self, other: Query) -> Query:
+        return Or(self, other)
+
+    def __invert__(self) -> Query:
+        return Not(self)
+
+
+@dataclass(frozen=True)
+class _Term(Query):
+    """A single index lookup."""
+
+    index = ""  # PatternStore index name, set by subclasses
+    value: str
+
+    def __str__(self) -> str:
+        return f'{_FIELD_NAMES[type(self)]}:"{self.value}"'
+
+
+@dataclass(frozen=True)
+class HasTag(_Term):
+    index = "tag"
+
+
+@dataclass(frozen=True)
+class InDomain(_Term):
+    index = "domain"
+
+
+@dataclass(frozen=True)
+class HasPrecondition(_Term):
+    index = "precondition"
+
+
+@dataclass(frozen=True, init=False)
+class GoalTypeIs(_Term):
+    index = "goal"
+
+    def __init__(self, goal_type: GoalType | str) -> None:
+        object.__setattr__(self, "value", GoalType(goal_type).value)
+
+
+@dataclass(frozen=True, init=False)
+class CompositionIs(_Term):
+    index = "composition"
+
+    def __init__(self, composition_type: CompositionType | str) -> None:
+        object.__setattr__(self, "value", CompositionType(composition_type).value)
+
+
+@dataclass(frozen=True, init=False)
+class And(Query):
+    parts: tuple[Query, ...]
+
+    def __init__(self, *parts: Query) -> None:
+        object.__setattr__(self, "parts", parts)
+
+    def __str__(self) -> str:
+        return "(" + " AND ".join(str(p) for p in self.parts) + ")"
+
+
+@dataclass(frozen=True, init=False)
+class Or(Query):
+    parts: tuple[Query, ...]
+
+    def __init__(self, *parts: Query) -> None:
+        object.__setattr__(self, "parts", parts)
+
+    def __str__(self) -> str:
+        return "(" + " OR ".join(str(p) for p in self.parts) + ")"
+
+
+@dataclass(frozen=True)
+class Not(Query):
+    part: Query
+
+    def __str__(self) -> str:
+        return f"NOT {self.part}"
+
+
+@dataclass(frozen=True)
+class All(Query):
+    """Matches every pattern."""
+
+    def __str__(self) -> str:
+        return "ALL"
+
+
+_FIELDS: dict[str, type[_Term]] = {
+    "tag": HasTag,
+    "domain": InDomain,
+    "pre": HasPrecondition,
+    "precondition": HasPrecondition,
+    "goal": GoalTypeIs,
+    "composition": CompositionIs,
+}
+_FIELD_NAMES: dict[type[_Term], str] = {
+    HasTag: "tag",
+    InDomain: "domain",
+    HasPrecondition: "pre",
+    GoalTypeIs: "goal",
+    CompositionIs: "composition",
+}
+
+
+# ---------------------------------------------------------------------------
+# Text syntax
+# ---------------------------------------------------------------------------
+
+_TOKEN = re.compile(
+    r'\s*(?:(?P<paren>[()])|(?P<term>(?P<field>\w+):(?:"(?P<quoted>[^"]*)"|(?P<bare>[^\s()"]+)))|(?P<word>\w+))'
+)
+
+
+def parse_query(text: str) -> Query:
+    """Parse the text query syntax (see module docstring) into a Query."""
+    tokens: list[tuple[str, str | Query]] = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if m is None:
+            raise ValueError(f"invalid query syntax at offset {pos}: {text[pos:pos + 20]!r}")
+        pos = m.end()
+        if m.group("paren"):
+            tokens.append((m.group("paren"), m.group("paren")))
+        elif m.group("term"):
+            field_name = m.group("field").lower()
+            term_type = _FIELDS.get(field_name)
+            if term_type is None:
+                raise ValueError(f"unknown query field {field_name!r}")
+            value = m.group("quoted") if m.group("quoted") is not None else m.group("bare")
+            tokens.append(("term", term_type(value)))
+        else:
+            word = m.group("word").upper()
+            if word not in ("AND", "OR", "NOT", "ALL"):
+                raise ValueError(f"unexpected word {m.group('word')!r}; terms are field:value")
+            tokens.append((word, word))
+
+    parser = _Parser(tokens)
+    query = parser.parse_or()
+    if parser.pos != len(tokens):
+        raise ValueError(f"unexpected {tokens[parser.pos][1]!r} in query")
+    return query
+
+
+class _Parser:
+    def __init__(self, tokens: list[tuple[str, str | Query]]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> str | None:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def parse_or(self) -> Query:
+        parts = [self.parse_and()]
+        while self.peek() == "OR":
+            self.pos += 1
+            parts.append(self.parse_and())
+        return parts[0] if len(parts) == 1 else Or(*parts)
+
+    def parse_and(self) -> Query:
+        parts = [self.parse_not()]
+        while self.peek() in ("AND", "NOT", "term", "(", "ALL"):
+            if self.peek() == "AND":
+                self.pos += 1
+            parts.append(self.parse_not())
+        return parts[0] if len(parts) == 1 else And(*parts)
+
+    def parse_not(self) -> Query:
+        if self.peek() == "NOT":
+            self.pos += 1
+            return Not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self) -> Query:
+        kind = self.peek()
+        if kind is None:
+            raise ValueError("unexpected end of query")
+        token = self.tokens[self.pos][1]
+        self.pos += 1
+        if kind == "term":
+            return token  # type: ignore[return-value]
+        if kind == "ALL":
+            return All()
+        if kind == "(":
+            query = self.parse_or()
+            if self.peek() != ")":
+                raise ValueError("missing ')' in query")
+            self.pos += 1
+            return query
+        raise ValueError(f"unexpected {token!r} in query")
+
+
+# ---------------------------------------------------------------------------
+# Planning and execution
+# ---------------------------------------------------------------------------
+
+
+class PlanNode:
+    """A compiled query node with a cardinality estimate."""
+
+    estimate: int
+
+    def evaluate(self) -> set[str]:
+        """All matching pattern ids."""
+        raise NotImplementedError
+
+    def filter(self, candidates: set[str]) -> set[str]:
+        """The subset of candidates that match."""
+        raise NotImplementedError
+
+    def explain(self, depth: int = 0) -> list[str]:
+        raise NotImplementedError
+
+
+class _Scan(PlanNode):
+    def __init__(self, term: _Term, postings: set[str]) -> None:
+        self.term = term
+        self.postings = postings
+        self.estimate = len(postings)
+
+    def evaluate(self) -> set[str]:
+        return set(self.postings)
+
+    def filter(self, candidates: set[str]) -> set[str]:
+        if len(candidates) <= len(self.postings):
+            return {pid for pid in candidates if pid in self.postings}
+        return {pid for pid in self.postings if pid in candidates}
+
+    def explain(self, depth: int = 0) -> list[str]:
+        return [f"{'  ' * depth}INDEX {self.term} (~{self.estimate})"]
+
+
+class _Universe(PlanNode):
+    def __init__(self, ids: Iterable[str], size: int) -> None:
+        self.ids = ids
+        self.estimate = size
+
+    def evaluate(self) -> set[str]:
+        return set(self.ids)
+
+    def filter(self, candidates: set[str]) -> set[str]:
+        return set(candidates)
+
+    def explain(self, depth: int = 0) -> list[str]:
+        return [f"{'  ' * depth}ALL (~{self.estimate})"]
+
+
+class _Complement(PlanNode):
+    def __init__(self, child: PlanNode, universe: _Universe) -> None:
+        self.child = child
+        self.universe = universe
+        self.estimate = max(universe.estimate - child.estimate, 0)
+
+    def evaluate(self) -> set[str]:
+        return self.universe.evaluate() - self.child.evaluate()
+
+    def filter(self, candidates: set[str]) -> set[str]:
+        return candidates - self.child.filter(candidates)
+
+    def explain(self, depth: int = 0) -> list[str]:
+        return [f"{'  ' * depth}NOT (~{self.estimate})", *self.child.explain(depth + 1)]
+
+
+class _Intersect(PlanNode):
+    """Drive from the most selective positive operand; filter by the rest."""
+
+    def __init__(self, children: list[PlanNode], universe: _Universe) -> None:
+        ordered = sorted(children, key=lambda c: c.estimate)
+        positive = [c for c in ordered if not isinstance(c, _Complement)]
+        self.driver = positive[0] if positive else universe
+        self.filters = [c for c in ordered if c is not self.driver]
+        self.estimate = min(c.estimate for c in children)
+
+    def evaluate(self) -> set[str]:
+        return self.filter(self.driver.evaluate(), drive=False)
+
+    def filter(self, candidates: set[str], drive: bool = True) -> set[str]:
+        if drive:
+            candidates = self.driver.filter(candidates)
+        for child in self.filters:
+            if not candidates:
+                break
+            candidates = child.filter(candidates)
+        return candidates
+
+    def explain(self, depth: int = 0) -> list[str]:
+        lines = [f"{'  ' * depth}AND (~{self.estimate})"]
+        lines += [f"{'  ' * (depth + 1)}drive:"] + self.driver.explain(depth + 2)
+        if self.filters:
+            lines.append(f"{'  ' * (depth + 1)}filter:")
+            for child in self.filters:
+                lines += child.explain(depth + 2)
+        return lines
+
+
+class _Union(PlanNode):
+    def __init__(self, children: list[PlanNode], universe_size: int) -> None:
+        self.children = children
+        self.estimate = min(sum(c.estimate for c in children), universe_size)
+
+    def evaluate(self) -> set[str]:
+        result: set[str] = set()
+        for child in self.children:
+            result |= child.evaluate()
+        return result
+
+    def filter(self, candidates: set[str]) -> set[str]:
+        result: set[str] = set()
+        for child in self.children:
+            remaining = candidates - result
+            if not remaining:
+                break
+            result |= child.filter(remaining)
+        return result
+
+    def explain(self, depth: int = 0) -> list[str]:
+        lines = [f"{'  ' * depth}OR (~{self.estimate})"]
+        for child in self.children:
+            lines += child.explain(depth + 1)
+        return lines
+
+
+class QueryPlan:
+    """A query compiled against one store's indexes."""
+
+    def __init__(self, query: Query, root: PlanNode) -> None:
+        self.query = query
+        self.root = root
+
+    def execute(self) -> set[str]:
+        """Ids of the matching patterns."""
+        return self.root.evaluate()
+
+    def explain(self) -> str:
+        return "\n".join(self.root.explain())
+
+
+def compile_query(query: Query | str, store: PatternStore) -> QueryPlan:
+    """Compile a query (or its text form) into a plan over the store's indexes."""
+    if isinstance(query, str):
+        query = parse_query(query)
+    universe = _Universe(store._patterns.keys(), len(store))
+    return QueryPlan(query, _compile(query, store, universe))
+
+
+def _compile(query: Query, store: PatternStore, universe: _Universe) -> PlanNode:
+    if isinstance(query, _Term):
+        return _Scan(query, store._postings(query.index, query.value))
+    if isinstance(query, All):
+        return universe
+    if isinstance(query, Not):
+        return _Complement(_compile(query.part, store, universe), universe)
+    if isinstance(query, And):
+        if not query.parts:
+            return universe
+        return _Intersect([_compile(p, store, universe) for p in query.parts], universe)
+    if isinstance(query, Or):
+        return _Union([_compile(p, store, universe) for p in query.parts], universe.estimate)
+    raise TypeError(f"not a query: {query!r}")
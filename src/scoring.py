@@ -0,0 +1,164 @@
+"""
+Match scorers: how precondition overlap turns into a score.
+
+By default a pattern's score is the fraction of its preconditions the
+problem satisfies (Overlap), so every precondition counts the same and
+common features like recursive_decomposability dominate rankings. A
+weighted scorer gives each feature a weight. A full match scores 1.0, so
+threshold and MatchResult.is_exact keep their meaning; a partial match scores
+
+    score = factor(pattern) · Σ weight(f), f matched / Σ weight(f), f required
+
+where 0 < factor ≤ 1, so it stays below 1.0:
+
+    Overlap    weight 1, factor 1 (the store's bitmask fast path)
+    IDF        weight = smoothed inverse document frequency of f
+    BM25       BM25 idf weights, and a length-normalisation factor that is
+               1 for the store's shortest patterns and falls with length
+    Weighted   user-supplied weights per feature
+
+Document frequencies are the lengths of the store's precondition posting
+lists, which add/remove already keep current; weights are derived from them
+on demand and cached until the store next changes.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .store import PatternStore
+
+
+class Scorer:
+    """Base class: unit weights and no per-pattern factor."""
+
+    # False only for Overlap, which the store scores with bitmasks directly
+    weighted = True
+
+    def feature_weight(self, document_frequency: int, n_patterns: int, feature: str) -> float:
+        """Weight of a feature required by document_frequency of n_patterns patterns."""
+        return 1.0
+
+    def pattern_factor(self, n_preconditions: int, average_preconditions: float, shortest: int) -> float:
+        """
+        Multiplier in (0, 1] applied to a partial match's weighted fraction.
+
+        shortest is the smallest number of preconditions of any pattern in
+        the store.
+        """
+        return 1.0
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class Overlap(Scorer):
+    """Fraction of preconditions met; the default."""
+
+    weighted = False
+
+
+class IDF(Scorer):
+    """Rare preconditions count more: weight = 1 + ln((1 + N) / (1 + df))."""
+
+    def feature_weight(self, document_frequency: int, n_patterns: int, feature: str) -> float:
+        return 1.0 + math.log((1 + n_patterns) / (1 + document_frequency))
+
+
+class BM25(Scorer):
+    """
+    BM25-style scoring with binary term frequency.
+
+    Features carry BM25 idf weights. A partial match's weighted fraction is
+    scaled by L(n) / L(n_min), where L(n) = (k1 + 1) / (1 + k1 · (1 - b + b · n / avg_n))
+    is BM25's length normalisation, n is the pattern's number of
+    preconditions and n_min the store's shortest, so meeting part of a long
+    pattern counts for less than meeting the same share of a short one.
+    Full matches score 1.0 whatever their length; b = 0 turns the length
+    normalisation off.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+
+    def feature_weight(self, document_frequency: int, n_patterns: int, feature: str) -> float:
+        return math.log(1 + (n_patterns - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def pattern_factor(self, n_preconditions: int, average_preconditions: float, shortest: int) -> float:
+        return self._length_norm(n_preconditions, average_preconditions) / self._length_norm(
+            shortest, average_preconditions,
+        )
+
+    def _length_norm(self, n_preconditions: int, average_preconditions: float) -> float:
+        k1, b = self.k1, self.b
+        return (k1 + 1) / (1 + k1 * (1 - b + b * n_preconditions / average_preconditions))
+
+    def __repr__(self) -> str:
+        return f"BM25(k1={self.k1}, b={self.b})"
+
+
+class Weighted(Scorer):
+    """User-supplied feature weights; unlisted features get the default weight."""
+
+    def __init__(self, weights: dict[str, float], default: float = 1.0) -> None:
+        if default <= 0 or any(w <= 0 for w in weights.values()):
+            raise ValueError("feature weights must be positive")
+        self.weights = dict(weights)
+        self.default = default
+
+    def feature_weight(self, document_frequency: int, n_patterns: int, feature: str) -> float:
+        return self.weights.get(feature, self.default)
+
+    def __repr__(self) -> str:
+        return f"Weighted({self.weights!r}, default={self.default})"
+
+
+class FeatureWeights:
+    """
+    A scorer's weights over one version of a store, computed on demand.
+
+    The store replaces this object whenever it changes, so nothing here is
+    ever stale.
+    """
+
+    def __init__(self, scorer: Scorer, store: PatternStore) -> None:
+        self.scorer = scorer
+        self.version = store._version
+        self._store = store
+        self._n_patterns = len(store._masks)
+        self._average: float | None = None
+        self._shortest = 0
+        self._weights: dict[str, float] = {}
+        # pattern id → factor / total weight of its preconditions, filled by scale()
+        self.scales: dict[str, float] = {}
+        self._factors: dict[str, float] = {}
+
+    def weight(self, feature: str) -> float:
+        w = self._weights.get(feature)
+        if w is None:
+            df = len(self._store._precondition_index.get(feature, ()))
+            w = self._weights[feature] = self.scorer.feature_weight(df, self._n_patterns, feature)
+        return w
+
+    def factor(self, pattern_id: str) -> float:
+        f = self._factors.get(pattern_id)
+        if f is None:
+            sizes = self._store._sizes
+            if self._average is None:
+                self._average = sum(sizes.values()) / max(self._n_patterns, 1)
+                self._shortest = min(sizes.values())
+            f = self.scorer.pattern_factor(sizes[pattern_id], self._average, self._shortest)
+            self._factors[pattern_id] = f
+        return f
+
+    def scale(self, pattern_id: str) -> float:
+        """Multiply a pattern's matched weight by this to get its score."""
+        s = self.scales.get(pattern_id)
+        if s is None:
+            store = self._store
+            total = sum(self.weight(f) for f in store._vocabulary.names(store._masks[pattern_id]))
+            s = self.scales[pattern_id] = self.factor(pattern_id) / total
+        return s
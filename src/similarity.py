@@ -0,0 +1,217 @@
+"""
+Structural similarity: nearest patterns by Weisfeiler-Lehman embeddings.
+
+A structure's embedding counts its WL subtree patterns (entity types, then
+each entity's typed neighbourhood, refined for a few rounds, as in
+isomorphism.structure_hash), hashed into a fixed number of dimensions and
+L2-normalised. The dot product of two embeddings is then the cosine
+similarity of their subtree histograms, i.e. a normalised WL subtree kernel.
+
+SimilarityIndex holds the embeddings of a store's patterns, as a NumPy
+matrix when NumPy is installed and as sparse dicts otherwise, and answers
+top-k queries either exactly, by scoring every pattern, or approximately
+with random-projection LSH: each of `tables` hash tables buckets vectors by
+the signs of `planes` random projections, and only patterns sharing a
+bucket with the query are scored.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import random
+from collections import Counter
+from typing import Any
+
+from .core import Structure
+from .isomorphism import StructureGraph, _digest, _refine
+from .vectorized import np
+
+DIMENSIONS = 256
+ITERATIONS = 2
+
+# Matrix scores within this of the k-th best are rescored exactly, so
+# rounding in the matrix product cannot change which patterns make the cut
+_SLACK = 1e-9
+
+# A sparse embedding: dimension → weight
+Embedding = dict[int, float]
+
+
+def embed(
+    structure: Structure | StructureGraph,
+    dimensions: int = DIMENSIONS,
+    iterations: int = ITERATIONS,
+) -> Embedding:
+    """
+    The L2-normalised, feature-hashed WL subtree histogram of a structure.
+
+    Args:
+        structure: Structure (or its compiled StructureGraph) to embed
+        dimensions: Length of the embedding
+        iterations: WL refinement rounds; round r captures neighbourhoods of radius r
+
+    Returns:
+        Non-zero dimensions of the embedding; empty for an empty structure
+    """
+    g = structure if isinstance(structure, StructureGraph) else StructureGraph(structure)
+    counts: Counter[int] = Counter()
+    colors = {n: _digest(t) for n, t in g.types.items()}
+    for depth in range(iterations + 1):
+        for color in colors.values():
+            counts[int(color[:8], 16) % dimensions] += 1
+        if depth < iterations:
+            colors = _refine(g, colors)
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {dim: c / norm for dim, c in counts.items()}
+
+
+def _squared_norm(a: Embedding) -> float:
+    return math.fsum(w * w for w in a.values())
+
+
+def _cosine(a: Embedding, a_norm: float, b: Embedding, b_norm: float) -> float:
+    """
+    Cosine of two embeddings given their squared norms, clamped to [0, 1].
+
+    The embeddings are already unit length up to rounding; dividing by the
+    norms again makes equal histograms score exactly 1.0, and fsum makes
+    the score independent of dict order, so equal scores tie exactly and
+    fall back to pattern id.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    dot = math.fsum(w * b[dim] for dim, w in a.items() if dim in b)
+    return min(dot / math.sqrt(a_norm * b_norm), 1.0) if dot > 0 else 0.0
+
+
+def _rank(item: tuple[float, str]) -> tuple[float, str]:
+    score, pattern_id = item
+    return -score, pattern_id
+
+
+class SimilarityIndex:
+    """
+    A snapshot of pattern embeddings for nearest-neighbour queries.
+
+    The snapshot is immutable; the store rebuilds it after add/remove. LSH
+    tables are built on the first approximate query. More planes per table
+    make buckets smaller (faster, lower recall); more tables raise recall.
+    Embeddings are non-negative, so even unrelated structures are at most
+    90° apart and collide on each plane at least half the time; the
+    defaults (6 planes, 16 tables) keep recall of the exact top 10 around
+    0.9 on benchmarks/bench_similarity.py's workload. With NumPy an exact
+    query is one matrix-vector product and beat LSH at every store size
+    benchmarked (up to 50k patterns), so LSH pays off mainly without NumPy.
+    """
+
+    def __init__(
+        self,
+        pattern_ids: list[str],
+        embeddings: list[Embedding],
+        dimensions: int = DIMENSIONS,
+        planes: int = 6,
+        tables: int = 16,
+        seed: int = 0,
+    ) -> None:
+        self.pattern_ids = pattern_ids
+        self.embeddings = embeddings
+        self.dimensions = dimensions
+        self.planes = planes
+        self.tables = tables
+        self.seed = seed
+        self.norms = [_squared_norm(vector) for vector in embeddings]
+        self.matrix = None
+        if np is not None:
+            self.matrix = np.zeros((len(pattern_ids), dimensions))
+            for row, vector in enumerate(embeddings):
+                if vector:
+                    self.matrix[row, list(vector)] = list(vector.values())
+        # (projections, buckets), built on first use and published in one
+        # assignment so concurrent readers never see half-filled tables.
+        # With NumPy the projections are a dimensions × (tables · planes) array.
+        self._lsh: tuple[Any, list[dict[int, list[int]]]] | None = None
+
+    def _dense(self, vector: Embedding):
+        dense = np.zeros(self.dimensions)
+        if vector:
+            dense[list(vector)] = list(vector.values())
+        return dense
+
+    def _top(self, vector: Embedding, k: int, rows: list[int] | None = None) -> list[tuple[float, str]]:
+        """The k best (similarity, pattern_id) among rows (all rows if None), zero scores dropped."""
+        ids = self.pattern_ids
+        embeddings = self.embeddings
+        selected = range(len(ids)) if rows is None else rows
+        if self.matrix is not None:
+            # The matrix product only shortlists; survivors are rescored exactly
+            # below so both paths return the same scores in the same order
+            matrix = self.matrix if rows is None else self.matrix[rows]
+            scores = matrix @ self._dense(vector)
+            keep = scores > 0
+            if k < len(scores):
+                keep &= scores >= np.partition(scores, len(scores) - k)[len(scores) - k] - _SLACK
+            selected = [selected[i] for i in np.flatnonzero(keep).tolist()]
+        norm = _squared_norm(vector)
+        norms = self.norms
+        scored = ((_cosine(vector, norm, embeddings[r], norms[r]), ids[r]) for r in selected)
+        return heapq.nsmallest(k, (item for item in scored if item[0] > 0), key=_rank)
+
+    def nearest(self, vector: Embedding, k: int) -> list[tuple[float, str]]:
+        """The k most similar patterns as (similarity, pattern_id), best first."""
+        return self._top(vector, k)
+
+    def approximate(self, vector: Embedding, k: int) -> list[tuple[float, str]]:
+        """
+        Like nearest(), scoring only patterns that share an LSH bucket with
+        the query. Falls back to an exact scan when fewer than k candidates
+        are found.
+        """
+        lsh = self._lsh
+        if lsh is None:
+            lsh = self._lsh = self._build_tables()
+        projections, buckets = lsh
+        rows: set[int] = set()
+        for table, key in zip(buckets, self._keys(vector, projections)):
+            rows.update(table.get(key, ()))
+        if len(rows) < k:
+            return self.nearest(vector, k)
+        return self._top(vector, k, sorted(rows))
+
+    def _build_tables(self) -> tuple[Any, list[dict[int, list[int]]]]:
+        rng = random.Random(self.seed)
+        projections: Any = [
+            [rng.gauss(0.0, 1.0) for _ in range(self.dimensions)]
+            for _ in range(self.tables * self.planes)
+        ]
+        buckets: list[dict[int, list[int]]] = [{} for _ in range(self.tables)]
+        if self.matrix is not None:
+            projections = np.asarray(projections).T
+            all_keys = self._sign_keys(self.matrix, projections).tolist()
+        else:
+            all_keys = [self._keys(vector, projections) for vector in self.embeddings]
+        for row, row_keys in enumerate(all_keys):
+            for table, key in zip(buckets, row_keys):
+                table.setdefault(key, []).append(row)
+        return projections, buckets
+
+    def _sign_keys(self, matrix, projections):
+        """_keys for every row of a dense matrix at once."""
+        signs = (matrix @ projections) > 0
+        weights = 1 << np.arange(self.planes, dtype=np.int64)
+        return signs.reshape(len(matrix), self.tables, self.planes) @ weights
+
+    def _keys(self, vector: Embedding, projections: Any) -> list[int]:
+        """One bucket key per table: the signs of that table's projections as bits."""
+        if self.matrix is not None:
+            # Same arithmetic as the stored rows, so a copy lands in their buckets
+            return self._sign_keys(self._dense(vector)[None, :], projections)[0].tolist()
+        keys = []
+        for t in range(self.tables):
+            key = 0
+            for bit in range(self.planes):
+                plane = projections[t * self.planes + bit]
+                if sum(w * plane[dim] for dim, w in vector.items()) > 0:
+                    key |= 1 << bit
+            keys.append(key)
+        return keys
@@ -0,0 +1,376 @@
+"""
+SQLite-backed persistent PatternStore.
+
+Patterns live in a SQLite database (standard-library sqlite3), so a store
+can outgrow RAM and survives restarts without re-loading JSON. Matching
+and search run as indexed queries; only the patterns a query returns are
+deserialized.
+
+Schema:
+    patterns(rowid, id, n_preconditions, data)   data = compact pattern JSON
+    preconditions(feature, pattern_id)
+    tags(tag, pattern_id)
+    domains(domain, pattern_id)
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import sqlite3
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from . import binary
+from .core import Pattern, Problem
+from .store import (
+    MatchResult,
+    _dict_to_pattern,
+    _iter_json_array,
+    _pattern_to_dict,
+    _rank,
+    _write_json_array,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patterns (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    n_preconditions INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS patterns_unconditional
+    ON patterns(n_preconditions) WHERE n_preconditions = 0;
+CREATE TABLE IF NOT EXISTS preconditions (
+    feature TEXT NOT NULL,
+    pattern_id TEXT NOT NULL,
+    PRIMARY KEY (feature, pattern_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS preconditions_by_pattern ON preconditions(pattern_id);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    pattern_id TEXT NOT NULL,
+    PRIMARY KEY (tag, pattern_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_by_pattern ON tags(pattern_id);
+CREATE TABLE IF NOT EXISTS domains (
+    domain TEXT NOT NULL,
+    pattern_id TEXT NOT NULL,
+    PRIMARY KEY (domain, pattern_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS domains_by_pattern ON domains(pattern_id);
+"""
+
+# Stay well below SQLite's host-parameter limit
+_MAX_PARAMS = 900
+
+
+class SQLitePatternStore:
+    """
+    A PatternStore persisted in SQLite, with the same public API as the
+    in-memory PatternStore.
+
+    Scores follow the same rule (fraction of preconditions met, 0.1 for
+    patterns without preconditions, ties broken by pattern id).
+
+    Patterns returned by the store are deserialized copies: after mutating
+    one (e.g. add_instantiation), add() it again to persist the change.
+
+    Usage:
+        with SQLitePatternStore("patterns.db") as store:
+            store.load("pattern_store.json")
+            best = store.best_match(problem)
+    """
+
+    def __init__(self, path: str | Path = ":memory:") -> None:
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, pattern: Pattern) -> None:
+        """Add (or replace) a pattern."""
+        self.add_many([pattern])
+
+    def add_many(self, patterns: Iterable[Pattern]) -> int:
+        """Insert or replace patterns in a single transaction. Returns the number written."""
+        count = 0
+        with self._conn:
+            for pattern in patterns:
+                self._write(pattern)
+                count += 1
+        return count
+
+    def _write(self, pattern: Pattern) -> None:
+        required = list(dict.fromkeys(pattern.solution.preconditions))
+        data = json.dumps(_pattern_to_dict(pattern), separators=(",", ":"))
+        cur = self._conn.cursor()
+        # Upsert keeps the original rowid, so re-added patterns keep their position
+        cur.execute(
+            "INSERT INTO patterns (id, n_preconditions, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET n_preconditions = excluded.n_preconditions, data = excluded.data",
+            (pattern.id, len(required), data),
+        )
+        self._delete_postings(cur, pattern.id)
+        cur.executemany(
+            "INSERT INTO preconditions (feature, pattern_id) VALUES (?, ?)",
+            [(f, pattern.id) for f in required],
+        )
+        cur.executemany(
+            "INSERT INTO tags (tag, pattern_id) VALUES (?, ?)",
+            [(t, pattern.id) for t in dict.fromkeys(pattern.tags)],
+        )
+        cur.executemany(
+            "INSERT INTO domains (domain, pattern_id) VALUES (?, ?)",
+            [(d, pattern.id) for d in pattern.domains_covered],
+        )
+
+    @staticmethod
+    def _delete_postings(cur: sqlite3.Cursor, pattern_id: str) -> None:
+        cur.execute("DELETE FROM preconditions WHERE pattern_id = ?", (pattern_id,))
+        cur.execute("DELETE FROM tags WHERE pattern_id = ?", (pattern_id,))
+        cur.execute("DELETE FROM domains WHERE pattern_id = ?", (pattern_id,))
+
+    def get(self, pattern_id: str) -> Pattern | None:
+        row = self._conn.execute("SELECT data FROM patterns WHERE id = ?", (pattern_id,)).fetchone()
+        return _dict_to_pattern(json.loads(row[0])) if row else None
+
+    def remove(self, pattern_id: str) -> bool:
+        with self._conn:
+            cur = self._conn.cursor()
+            cur.execute("DELETE FROM patterns WHERE id = ?", (pattern_id,))
+            if cur.rowcount == 0:
+                return False
+            self._delete_postings(cur, pattern_id)
+        return True
+
+    @property
+    def all_patterns(self) -> list[Pattern]:
+        return list(self._iter_patterns())
+
+    def _iter_patterns(self) -> Iterator[Pattern]:
+        for (data,) in self._conn.execute("SELECT data FROM patterns ORDER BY rowid"):
+            yield _dict_to_pattern(json.loads(data))
+
+    def _fetch(self, pattern_ids: list[str]) -> dict[str, Pattern]:
+        """Deserialize the given patterns, in chunks of bound parameters."""
+        found: dict[str, Pattern] = {}
+        for i in range(0, len(pattern_ids), _MAX_PARAMS):
+            chunk = pattern_ids[i:i + _MAX_PARAMS]
+            rows = self._conn.execute(
+                f"SELECT id, data FROM patterns WHERE id IN ({_placeholders(chunk)})", chunk,
+            )
+            for pattern_id, data in rows:
+                found[pattern_id] = _dict_to_pattern(json.loads(data))
+        return found
+
+    # -- matching -----------------------------------------------------------
+
+    def match(
+        self,
+        problem: Problem,
+        threshold: float = 0.5,
+        top_k: int | None = None,
+    ) -> list[MatchResult]:
+        """
+        Find patterns whose preconditions match the problem's structure.
+
+        Args:
+            problem: The abstract problem to match against
+            threshold: Minimum score (0-1) to include in results
+            top_k: If given, return only the k best results
+
+        Returns:
+            List of MatchResults sorted by score (descending), ties broken by pattern id
+        """
+        return self._match_features(problem.match_features, threshold, top_k)
+
+    def best_match(self, problem: Problem, threshold: float = 0.5) -> MatchResult | None:
+        """The highest-scoring match for the problem, or None if nothing reaches the threshold."""
+        results = self._match_features(problem.match_features, threshold, top_k=1)
+        return results[0] if results else None
+
+    def match_many(
+        self,
+        problems: Iterable[Problem],
+        threshold: float = 0.5,
+        top_k: int | None = None,
+    ) -> list[list[MatchResult]]:
+        """Match a batch of problems; identical feature sets are queried once."""
+        computed: dict[frozenset[str], list[MatchResult]] = {}
+        batch = []
+        for problem in problems:
+            features = problem.match_features
+            results = computed.get(features)
+            if results is None:
+                results = self._match_features(features, threshold, top_k)
+                computed[features] = results
+            batch.append(list(results))
+        return batch
+
+    def _match_features(
+        self,
+        problem_features: frozenset[str],
+        threshold: float,
+        top_k: int | None = None,
+    ) -> list[MatchResult]:
+        hits: dict[str, tuple[int, int]] = {}
+        features = list(problem_features)
+        for i in range(0, len(features), _MAX_PARAMS):
+            chunk = features[i:i + _MAX_PARAMS]
+            rows = self._conn.execute(
+                "SELECT pc.pattern_id, COUNT(*), p.n_preconditions "
+                "FROM preconditions pc JOIN patterns p ON p.id = pc.pattern_id "
+                f"WHERE pc.feature IN ({_placeholders(chunk)}) GROUP BY pc.pattern_id",
+                chunk,
+            )
+            for pattern_id, count, size in rows:
+                prev = hits.get(pattern_id)
+                hits[pattern_id] = (count + (prev[0] if prev else 0), size)
+
+        if threshold <= 0:
+            # Every conditional pattern qualifies, including zero-overlap ones
+            for pattern_id, size in self._conn.execute(
+                "SELECT id, n_preconditions FROM patterns WHERE n_preconditions > 0"
+            ):
+                hits.setdefault(pattern_id, (0, size))
+
+        def candidates() -> Iterator[tuple[float, str]]:
+            for (pattern_id,) in self._conn.execute(
+                "SELECT id FROM patterns WHERE n_preconditions = 0"
+            ):
+                # Pattern with no preconditions matches everything weakly
+                yield 0.1, pattern_id
+            for pattern_id, (count, size) in hits.items():
+                score = count / size
+                if score >= threshold:
+                    yield score, pattern_id
+
+        if top_k is None:
+            ranked = sorted(candidates(), key=_rank)
+        else:
+            ranked = heapq.nsmallest(top_k, candidates(), key=_rank)
+
+        patterns = self._fetch([pattern_id for _, pattern_id in ranked])
+        results = []
+        for score, pattern_id in ranked:
+            pattern = patterns[pattern_id]
+            required = set(pattern.solution.preconditions)
+            results.append(MatchResult(
+                pattern=pattern,
+                score=score,
+                matched_features=sorted(required & problem_features),
+                unmatched_preconditions=sorted(required - problem_features),
+            ))
+        return results
+
+    # -- search -------------------------------------------------------------
+
+    def search_by_tag(self, *tags: str) -> list[Pattern]:
+        """Find patterns that have all the given tags."""
+        tag_list = list(dict.fromkeys(tags))
+        if not tag_list:
+            return self.all_patterns
+        if len(tag_list) > _MAX_PARAMS:
+            raise ValueError(f"at most {_MAX_PARAMS} tags per query")
+        rows = self._conn.execute(
+            "SELECT p.data FROM patterns p JOIN ("
+            f"  SELECT pattern_id FROM tags WHERE tag IN ({_placeholders(tag_list)})"
+            "   GROUP BY pattern_id HAVING COUNT(*) = ?"
+            ") t ON t.pattern_id = p.id ORDER BY p.rowid",
+            [*tag_list, len(tag_list)],
+        )
+        return [_dict_to_pattern(json.loads(data)) for (data,) in rows]
+
+    def search_by_domain(self, domain: str) -> list[Pattern]:
+        """Find patterns that have been instantiated in a given domain."""
+        rows = self._conn.execute(
+            "SELECT p.data FROM domains d JOIN patterns p ON p.id = d.pattern_id "
+            "WHERE d.domain = ? ORDER BY p.rowid",
+            (domain,),
+        )
+        return [_dict_to_pattern(json.loads(data)) for (data,) in rows]
+
+    # -- persistence --------------------------------------------------------
+
+    def save(self, path: str | Path) -> None:
+        """Export the store to a JSON file (same format as PatternStore.save)."""
+        with open(path, "w") as fp:
+            _write_json_array(fp, (_pattern_to_dict(p) for p in self._iter_patterns()))
+
+    def load(
+        self,
+        path: str | Path,
+        progress: Callable[[int, int], None] | None = None,
+        chunk_size: int = 1 << 16,
+        batch_size: int = 1000,
+    ) -> None:
+        """
+        Import patterns from a JSON file, batch_size patterns per transaction.
+
+        Args:
+            path: JSON file written by save()
+            progress: Called after each batch with (patterns_loaded, bytes_read)
+            chunk_size: Number of bytes read from the file at a time
+            batch_size: Patterns inserted per transaction
+        """
+        with open(path, "rb") as fp:
+            items = (
+                (_dict_to_pattern(item), bytes_read)
+                for item, bytes_read in _iter_json_array(fp, chunk_size)
+            )
+            self._bulk_insert(items, progress, batch_size)
+
+    def save_binary(self, path: str | Path) -> None:
+        """Export the store to the compact binary format (see binary.py)."""
+        with open(path, "wb") as fp:
+            binary.write_patterns(fp, self._iter_patterns())
+
+    def load_binary(
+        self,
+        path: str | Path,
+        progress: Callable[[int, int], None] | None = None,
+        batch_size: int = 1000,
+    ) -> None:
+        """Import patterns from a file written by save_binary(), batch_size per transaction."""
+        with open(path, "rb") as fp:
+            self._bulk_insert(binary.iter_file(fp), progress, batch_size)
+
+    def _bulk_insert(
+        self,
+        items: Iterable[tuple[Pattern, int]],
+        progress: Callable[[int, int], None] | None,
+        batch_size: int,
+    ) -> None:
+        count = 0
+        batch: list[Pattern] = []
+        bytes_read = 0
+        for pattern, bytes_read in items:
+            batch.append(pattern)
+            if len(batch) >= batch_size:
+                count += self.add_many(batch)
+                batch.clear()
+                if progress is not None:
+                    progress(count, bytes_read)
+        if batch:
+            count += self.add_many(batch)
+            if progress is not None:
+                progress(count, bytes_read)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> SQLitePatternStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM patterns").fetchone()[0]
+
+    def __repr__(self) -> str:
+        return f"SQLitePatternStore({len(self)} patterns)"
+
+
+def _placeholders(items: list) -> str:
+    return ", ".join("?" * len(items))
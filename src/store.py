@@ -9,10 +9,22 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, TextIO
 
+import codecs
+import heapq
 import json
+import math
+import re
 
-from .core import Pattern, Problem
+from . import binary
+from .core import Instantiation, Pattern, Problem, Structure
+from .features import FeatureVocabulary
+from .isomorphism import StructureGraph, StructureSignature, find_embedding, is_isomorphic, structure_hash
+from .query import Query, compile_query
+from .scoring import FeatureWeights, Overlap, Scorer
+from .similarity import Embedding, SimilarityIndex, embed
+from .vectorized import HAS_NUMPY, VectorizedScorer
 
 
 @dataclass
@@ -29,6 +41,44 @@ class MatchResult:
         return self.score == 1.0
 
 
+@dataclass
+class StructuralMatch:
+    """A pattern whose problem structure embeds in the matched problem's structure."""
+
+    pattern: Pattern
+    mapping: dict[str, str]  # pattern entity id → problem entity id
+    coverage: float  # share of the problem's entities and relations covered, 0.0 to 1.0
+
+    @property
+    def is_exact(self) -> bool:
+        return self.coverage == 1.0
+
+
+@dataclass
+class SimilarityMatch:
+    """A pattern ranked by the structural similarity of its problem to a query problem."""
+
+    pattern: Pattern
+    similarity: float  # cosine of WL embeddings, 0.0 to 1.0
+
+
+def _discard_posting(index: dict[Any, set[str]], key: Any, pattern_id: str) -> None:
+    postings = index[key]
+    postings.discard(pattern_id)
+    if not postings:
+        del index[key]
+
+
+# Largest float below 1.0: the ceiling for partial weighted matches
+_BELOW_ONE = math.nextafter(1.0, 0.0)
+
+
+def _rank(item: tuple[float, str]) -> tuple[float, str]:
+    """Sort key for (score, pattern_id): best score first, then pattern id."""
+    score, pattern_id = item
+    return -score, pattern_id
+
+
 class PatternStore:
     """
     Stores abstract patterns and retrieves them by structural matching.
@@ -37,77 +87,634 @@ class PatternStore:
     1. Compute the problem's structural features
     2. For each pattern, check what fraction of its preconditions
        are satisfied by the problem's features
-    3. Rank by match score (fraction of preconditions met)
+    3. Rank by match score (fraction of preconditions met, or a weighted
+       fraction with an IDF/BM25/custom scorer, see scoring.py)
+
+    Step 2 is driven by an inverted index (precondition feature → pattern ids),
+    so only patterns sharing at least one feature with the problem are touched.
+    Each pattern's preconditions are held as a bitmask over the store's
+    FeatureVocabulary, so a score is popcount(pattern & problem) / popcount(pattern).
+    Tags and instantiation domains have posting lists too (tag → pattern ids,
+    domain → pattern ids) for search_by_tag/search_by_domain.
+
+    Indexes are maintained by add/remove/load, and Pattern.add_instantiation
+    updates the domain index of every store holding the pattern. If a stored
+    pattern's preconditions, tags or instantiations are edited in place,
+    re-add it to refresh the indexes.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, vectorized: bool = False, scorer: Scorer | None = None) -> None:
+        """
+        Args:
+            vectorized: Score with the NumPy matrix backend (see vectorized.py).
+                Ignored when NumPy is not installed.
+            scorer: How precondition overlap is scored (see scoring.py);
+                defaults to Overlap, the fraction of preconditions met.
+                Weighted scorers use the pure-Python path even if vectorized.
+        """
         self._patterns: dict[str, Pattern] = {}
+        # Bumped on every add/remove; derived snapshots compare against it
+        self._version = 0
+        # Inverted index: precondition feature → ids of patterns requiring it
+        self._precondition_index: dict[str, set[str]] = {}
+        # Per-pattern precondition bitmask and its popcount, as indexed at add() time
+        self._vocabulary = FeatureVocabulary()
+        self._masks: dict[str, int] = {}
+        self._sizes: dict[str, int] = {}
+        # Patterns with no preconditions (they match everything weakly)
+        self._unconditional: set[str] = set()
+        # Posting lists for search, plus each pattern's indexed keys for unindexing
+        self._tag_index: dict[str, set[str]] = {}
+        self._domain_index: dict[str, set[str]] = {}
+        self._indexed_tags: dict[str, frozenset[str]] = {}
+        self._indexed_domains: dict[str, set[str]] = {}
+        # Goal type / composition type value → pattern ids (for queries)
+        self._goal_index: dict[str, set[str]] = {}
+        self._composition_index: dict[str, set[str]] = {}
+        self._indexed_types: dict[str, tuple[str | None, str]] = {}
+        # Compiled problem structures, grouped by signature (match_structure)
+        # and by canonical hash (find_by_structure, dedup). Built lazily: ids
+        # indexed since the last structural query wait in pending, and
+        # compiled ids wait in pending_hashes until a query needs hashes.
+        self._structure_graphs: dict[str, StructureGraph] = {}
+        self._signature_index: dict[StructureSignature, set[str]] = {}
+        self._structure_hashes: dict[str, str] = {}
+        self._hash_index: dict[str, set[str]] = {}
+        self._pending_hashes: set[str] = set()
+        # WL embeddings for similar(), computed on demand, and their index snapshot
+        self._embeddings: dict[str, Embedding] = {}
+        self._similarity: SimilarityIndex | None = None
+        self._similarity_version = -1
+        self._pending_structures: set[str] = set()
+        # Insertion rank, so search results keep store order
+        self._seq: dict[str, int] = {}
+        self._next_seq = 0
+        self._vectorized = vectorized and HAS_NUMPY
+        self._scorer: VectorizedScorer | None = None
+        self._scorer_version = -1
+        self._match_scorer = scorer if scorer is not None else Overlap()
+        self._weights: FeatureWeights | None = None
 
     def add(self, pattern: Pattern) -> None:
         """Add a pattern to the store."""
+        previous = self._patterns.get(pattern.id)
+        if previous is not None:
+            self._unindex(pattern.id)
+            previous._detach(self)
+        else:
+            self._assign_seq(pattern.id)
         self._patterns[pattern.id] = pattern
+        self._index(pattern)
+        pattern._attach(self)
+        self._version += 1
 
     def get(self, pattern_id: str) -> Pattern | None:
         return self._patterns.get(pattern_id)
 
     def remove(self, pattern_id: str) -> bool:
-        return self._patterns.pop(pattern_id, None) is not None
+        pattern = self._patterns.get(pattern_id)
+        if pattern is None:
+            return False
+        self._unindex(pattern_id)
+        pattern._detach(self)
+        del self._patterns[pattern_id]
+        del self._seq[pattern_id]
+        self._version += 1
+        return True
 
     @property
     def all_patterns(self) -> list[Pattern]:
         return list(self._patterns.values())
 
-    def match(self, problem: Problem, threshold: float = 0.5) -> list[MatchResult]:
+    @property
+    def scorer(self) -> Scorer:
+        """The match scorer; assign a Scorer to change how match() ranks patterns."""
+        return self._match_scorer
+
+    @scorer.setter
+    def scorer(self, scorer: Scorer) -> None:
+        self._match_scorer = scorer
+
+    def match(
+        self,
+        problem: Problem,
+        threshold: float = 0.5,
+        top_k: int | None = None,
+    ) -> list[MatchResult]:
         """
         Find patterns whose preconditions match the problem's structure.
 
         Args:
             problem: The abstract problem to match against
             threshold: Minimum score (0-1) to include in results
+            top_k: If given, return only the k best results, selected with a
+                bounded heap instead of sorting every match
 
         Returns:
-            List of MatchResults sorted by score (descending)
+            List of MatchResults sorted by score (descending), ties broken by pattern id
         """
-        problem_features = set(problem.structural_features)
-        problem_features.update(problem.tags)
+        return self._match_features(problem.match_features, threshold, top_k)
 
-        results = []
-        for pattern in self._patterns.values():
-            required = set(pattern.solution.preconditions)
+    def best_match(self, problem: Problem, threshold: float = 0.5) -> MatchResult | None:
+        """The highest-scoring match for the problem, or None if nothing reaches the threshold."""
+        results = self._match_features(problem.match_features, threshold, top_k=1)
+        return results[0] if results else None
+
+    def match_many(
+        self,
+        problems: Iterable[Problem],
+        threshold: float = 0.5,
+        top_k: int | None = None,
+    ) -> list[list[MatchResult]]:
+        """
+        Match a batch of problems against the store.
+
+        Problems with identical feature sets (structural features plus tags,
+        restricted to features the store knows) are scored once and share
+        their results.
 
-            if not required:
+        Args:
+            problems: The abstract problems to match
+            threshold: Minimum score (0-1) to include in results
+            top_k: If given, keep only the k best results per problem
+
+        Returns:
+            One result list per problem, in input order
+        """
+        computed: dict[int, list[MatchResult]] = {}
+        batch = []
+        for problem in problems:
+            # Features unknown to the store cannot affect scores, so the mask is the key
+            problem_mask = self._vocabulary.lookup_mask(problem.match_features)
+            results = computed.get(problem_mask)
+            if results is None:
+                results = self._match_mask(problem_mask, threshold, top_k)
+                computed[problem_mask] = results
+            batch.append(list(results))
+        return batch
+
+    def _match_features(
+        self,
+        problem_features: Iterable[str],
+        threshold: float,
+        top_k: int | None = None,
+    ) -> list[MatchResult]:
+        """Score stored patterns against an already computed problem feature set."""
+        return self._match_mask(self._vocabulary.lookup_mask(problem_features), threshold, top_k)
+
+    def _match_mask(
+        self,
+        problem_mask: int,
+        threshold: float,
+        top_k: int | None = None,
+    ) -> list[MatchResult]:
+        """Score stored patterns against a problem feature bitmask."""
+        def candidates() -> Iterator[tuple[float, str]]:
+            for pattern_id in self._unconditional:
                 # Pattern with no preconditions matches everything weakly
-                results.append(MatchResult(
-                    pattern=pattern,
-                    score=0.1,
-                    matched_features=[],
-                    unmatched_preconditions=[],
-                ))
-                continue
+                yield 0.1, pattern_id
+            if self._match_scorer.weighted:
+                yield from self._score_weighted(problem_mask, threshold)
+            elif self._vectorized and self._masks:
+                yield from self._vector_scorer().above(problem_mask, threshold)
+            else:
+                yield from self._score_conditional(problem_mask, threshold)
+
+        if top_k is None:
+            ranked = sorted(candidates(), key=_rank)
+        else:
+            # Bounded heap: only k candidates are held at any time
+            ranked = heapq.nsmallest(top_k, candidates(), key=_rank)
+        return [self._result(pattern_id, score, problem_mask) for score, pattern_id in ranked]
+
+    def match_structure(self, problem: Problem, top_k: int | None = None) -> list[StructuralMatch]:
+        """
+        Find patterns whose problem structure occurs in the problem's structure.
+
+        A pattern matches when its entities map injectively onto the
+        problem's entities, preserving entity types and every typed relation
+        (subgraph isomorphism, see isomorphism.py). Patterns are grouped by
+        structure signature, so whole groups that cannot fit are skipped
+        before any search. Patterns with an empty structure are not returned.
+
+        Args:
+            problem: The abstract problem to match against
+            top_k: If given, return only the k best matches
+
+        Returns:
+            StructuralMatches sorted by coverage (descending), ties broken by pattern id
+        """
+        self._compile_pending_structures()
+        target = StructureGraph(problem.structure)
+        size = target.signature.n_entities + target.signature.n_relations
+        if not size:
+            return []
+
+        def candidates() -> Iterator[tuple[float, str, dict[str, str]]]:
+            for signature, pattern_ids in self._signature_index.items():
+                if not signature.n_entities or not target.signature.covers(signature):
+                    continue
+                coverage = (signature.n_entities + signature.n_relations) / size
+                for pattern_id in pattern_ids:
+                    mapping = find_embedding(self._structure_graphs[pattern_id], target)
+                    if mapping is not None:
+                        yield coverage, pattern_id, mapping
+
+        def key(item: tuple[float, str, dict[str, str]]) -> tuple[float, str]:
+            return -item[0], item[1]
+
+        if top_k is None:
+            ranked = sorted(candidates(), key=key)
+        else:
+            ranked = heapq.nsmallest(top_k, candidates(), key=key)
+        return [
+            StructuralMatch(self._patterns[pattern_id], mapping, coverage)
+            for coverage, pattern_id, mapping in ranked
+        ]
+
+    def _compile_pending_structures(self) -> None:
+        """Compile structures of patterns indexed since the last structural query."""
+        for pattern_id in self._pending_structures:
+            graph = StructureGraph(self._patterns[pattern_id].problem.structure)
+            self._structure_graphs[pattern_id] = graph
+            self._signature_index.setdefault(graph.signature, set()).add(pattern_id)
+        self._pending_hashes.update(self._pending_structures)
+        self._pending_structures.clear()
+
+    def _hash_pending_structures(self) -> None:
+        """Compile pending structures and hash the compiled ones not hashed yet."""
+        self._compile_pending_structures()
+        for pattern_id in self._pending_hashes:
+            graph_hash = structure_hash(self._structure_graphs[pattern_id])
+            self._structure_hashes[pattern_id] = graph_hash
+            self._hash_index.setdefault(graph_hash, set()).add(pattern_id)
+        self._pending_hashes.clear()
+
+    def similar(self, problem: Problem, k: int = 10, approximate: bool = False) -> list[SimilarityMatch]:
+        """
+        The k patterns whose problem structures are most similar to the problem's.
+
+        Similarity is the cosine of WL subtree embeddings (see similarity.py),
+        so it is 1.0 for isomorphic structures and degrades gracefully as
+        they diverge, unlike match_structure's all-or-nothing embedding test.
+        Patterns sharing no subtree with the problem are not returned.
+
+        Args:
+            problem: The abstract problem to compare against
+            k: Number of results
+            approximate: Score only LSH candidates instead of every pattern;
+                faster without NumPy, but misses about one neighbour in ten
+
+        Returns:
+            SimilarityMatches sorted by similarity (descending), ties broken by pattern id
+        """
+        if k <= 0:
+            return []
+        index = self._similarity_index()
+        vector = embed(problem.structure, index.dimensions)
+        if not vector:
+            return []
+        ranked = index.approximate(vector, k) if approximate else index.nearest(vector, k)
+        return [SimilarityMatch(self._patterns[pid], similarity) for similarity, pid in ranked]
+
+    def _similarity_index(self) -> SimilarityIndex:
+        """The embedding snapshot, rebuilt if the store changed since it was built."""
+        if self._similarity is None or self._similarity_version != self._version:
+            embeddings = self._embeddings
+            for pattern_id, pattern in self._patterns.items():
+                if pattern_id not in embeddings:
+                    graph = self._structure_graphs.get(pattern_id)
+                    embeddings[pattern_id] = embed(graph or pattern.problem.structure)
+            self._similarity = SimilarityIndex(list(embeddings), list(embeddings.values()))
+            self._similarity_version = self._version
+        return self._similarity
+
+    def find_by_structure(self, structure: Structure) -> list[Pattern]:
+        """
+        Find patterns whose problem structure is isomorphic to the given one.
+
+        Looks up the structure's canonical hash (see isomorphism.structure_hash)
+        and confirms each hit with an isomorphism check, so the cost depends
+        on the number of hits rather than the size of the store.
+        """
+        self._hash_pending_structures()
+        graph = StructureGraph(structure)
+        hits = self._hash_index.get(structure_hash(graph), ())
+        return self._in_store_order(
+            pid for pid in hits if is_isomorphic(self._structure_graphs[pid], graph)
+        )
+
+    def dedup(self) -> int:
+        """
+        Collapse patterns that are the same pattern under different ids.
+
+        Two patterns are duplicates when their problem structures are
+        isomorphic and they share goal type, preconditions, step operations
+        and composition type. The earliest pattern in store order survives
+        and takes over the others' instantiations, tags and related
+        patterns; the rest are removed, and related_patterns references to
+        them anywhere in the store are redirected to their survivor.
+
+        Returns:
+            Number of patterns removed
+        """
+        self._hash_pending_structures()
+        kept: dict[tuple, list[str]] = {}
+        merges: list[tuple[str, Pattern]] = []
+        for pattern in self._in_store_order(self._patterns):
+            key = self._dedup_key(pattern, self._structure_hashes[pattern.id])
+            group = kept.setdefault(key, [])
+            graph = self._structure_graphs[pattern.id]
+            survivor_id = next(
+                (pid for pid in group if is_isomorphic(self._structure_graphs[pid], graph)), None,
+            )
+            if survivor_id is None:
+                group.append(pattern.id)
+            else:
+                merges.append((survivor_id, pattern))
+        for survivor_id, duplicate in merges:
+            self.remove(duplicate.id)
+            self._merge(self._patterns[survivor_id], duplicate)
+        self._redirect_related({duplicate.id: survivor_id for survivor_id, duplicate in merges})
+        return len(merges)
+
+    def _find_duplicate(self, pattern: Pattern) -> Pattern | None:
+        """A stored pattern that dedup() would merge pattern into, if any."""
+        self._hash_pending_structures()
+        graph = StructureGraph(pattern.problem.structure)
+        graph_hash = structure_hash(graph)
+        key = self._dedup_key(pattern, graph_hash)
+        for pid in sorted(self._hash_index.get(graph_hash, ()), key=self._seq.__getitem__):
+            candidate = self._patterns[pid]
+            if (
+                candidate.id != pattern.id
+                and self._dedup_key(candidate, graph_hash) == key
+                and is_isomorphic(self._structure_graphs[pid], graph)
+            ):
+                return candidate
+        return None
+
+    @staticmethod
+    def _dedup_key(pattern: Pattern, graph_hash: str) -> tuple:
+        goal = pattern.problem.goal
+        transformation = pattern.solution.transformation
+        return (
+            graph_hash,
+            goal.type if goal else None,
+            frozenset(pattern.solution.preconditions),
+            tuple(step.operation for step in transformation.steps),
+            transformation.composition_type,
+        )
+
+    def _merge(self, survivor: Pattern, duplicate: Pattern) -> None:
+        """Fold duplicate's instantiations, tags and related patterns into survivor."""
+        for inst in duplicate.instantiations:
+            if inst not in survivor.instantiations:
+                survivor.add_instantiation(inst)
+        survivor.tags.extend(t for t in dict.fromkeys(duplicate.tags) if t not in survivor.tags)
+        survivor.related_patterns.extend(
+            r for r in dict.fromkeys(duplicate.related_patterns)
+            if r not in survivor.related_patterns and r not in (survivor.id, duplicate.id)
+        )
+        # Re-add so the tag index sees the merged tags
+        self.add(survivor)
+
+    def _redirect_related(self, aliases: dict[str, str]) -> None:
+        """Point related_patterns entries at merged-away ids to their survivors."""
+        if not aliases:
+            return
+        for pattern in self._patterns.values():
+            related = pattern.related_patterns
+            if any(r in aliases for r in related):
+                rewritten = dict.fromkeys(aliases.get(r, r) for r in related)
+                related[:] = [r for r in rewritten if r != pattern.id]
 
-            matched = required & problem_features
-            unmatched = required - problem_features
-            score = len(matched) / len(required)
+    def _load_pattern(self, pattern: Pattern, dedup: bool, aliases: dict[str, str]) -> None:
+        """
+        Add one loaded pattern, replacing a stored pattern with the same id
+        as add() does. With dedup, a pattern that duplicates another stored
+        pattern is merged into it instead: the stored pattern it replaces is
+        removed and aliases maps its id to the survivor's.
+        """
+        survivor = self._find_duplicate(pattern) if dedup else None
+        if survivor is None:
+            self.add(pattern)
+            # A later pattern under a merged-away id is a real pattern again
+            aliases.pop(pattern.id, None)
+            return
+        self.remove(pattern.id)
+        self._merge(survivor, pattern)
+        aliases[pattern.id] = survivor.id
 
+    def _score_conditional(self, problem_mask: int, threshold: float) -> Iterator[tuple[float, str]]:
+        """Pure-Python scoring of patterns that have preconditions."""
+        masks = self._masks
+        sizes = self._sizes
+
+        if threshold <= 0:
+            # Every conditional pattern qualifies, including zero-overlap ones
+            candidate_ids: Iterable[str] = masks.keys()
+        else:
+            candidate_ids = set()
+            for feature in self._vocabulary.names(problem_mask):
+                postings = self._precondition_index.get(feature)
+                if postings:
+                    candidate_ids.update(postings)
+
+        for pattern_id in candidate_ids:
+            score = (masks[pattern_id] & problem_mask).bit_count() / sizes[pattern_id]
             if score >= threshold:
-                results.append(MatchResult(
-                    pattern=pattern,
-                    score=score,
-                    matched_features=sorted(matched),
-                    unmatched_preconditions=sorted(unmatched),
-                ))
+                yield score, pattern_id
 
-        results.sort(key=lambda r: r.score, reverse=True)
-        return results
+    def _score_weighted(self, problem_mask: int, threshold: float) -> Iterator[tuple[float, str]]:
+        """
+        Weighted scoring (see scoring.py): accumulate each matched feature's
+        weight over its posting list, then scale by the pattern's total.
+        """
+        weights = self._feature_weights()
+        matched: dict[str, float] = {}
+        get = matched.get
+        for feature in self._vocabulary.names(problem_mask):
+            postings = self._precondition_index.get(feature)
+            if postings:
+                w = weights.weight(feature)
+                for pattern_id in postings:
+                    matched[pattern_id] = get(pattern_id, 0.0) + w
+
+        masks = self._masks
+        scales = weights.scales
+        # Every conditional pattern qualifies at threshold <= 0, including zero-overlap ones
+        candidate_ids: Iterable[str] = masks.keys() if threshold <= 0 else matched.keys()
+        for pattern_id in candidate_ids:
+            mask = masks[pattern_id]
+            if mask & problem_mask == mask:
+                # Exact, without summation rounding or length normalisation
+                score = 1.0
+            else:
+                scale = scales.get(pattern_id)
+                if scale is None:
+                    scale = weights.scale(pattern_id)
+                # A partial match must stay below 1.0 even if the sum rounds up
+                score = min(get(pattern_id, 0.0) * scale, _BELOW_ONE)
+            if score >= threshold:
+                yield score, pattern_id
+
+    def _feature_weights(self) -> FeatureWeights:
+        """The scorer's weights for the current store version."""
+        weights = self._weights
+        if weights is None or weights.version != self._version or weights.scorer is not self._match_scorer:
+            weights = self._weights = FeatureWeights(self._match_scorer, self)
+        return weights
+
+    def _vector_scorer(self) -> VectorizedScorer:
+        """The pattern × feature matrix, rebuilt if the store changed since it was built."""
+        if self._scorer is None or self._scorer_version != self._version:
+            self._scorer = VectorizedScorer(
+                list(self._masks), self._masks.values(), len(self._vocabulary),
+            )
+            self._scorer_version = self._version
+        return self._scorer
+
+    def _result(self, pattern_id: str, score: float, problem_mask: int) -> MatchResult:
+        mask = self._masks.get(pattern_id, 0)
+        return MatchResult(
+            pattern=self._patterns[pattern_id],
+            score=score,
+            matched_features=self._vocabulary.names(mask & problem_mask),
+            unmatched_preconditions=self._vocabulary.names(mask & ~problem_mask),
+        )
+
+    def _assign_seq(self, pattern_id: str) -> None:
+        self._seq[pattern_id] = self._next_seq
+        self._next_seq += 1
+
+    def _index(self, pattern: Pattern) -> None:
+        goal = pattern.problem.goal
+        self._index_keys(
+            pattern.id,
+            pattern.solution.preconditions,
+            pattern.tags,
+            (i.domain for i in pattern.instantiations),
+            goal.type.value if goal else None,
+            pattern.solution.transformation.composition_type.value,
+        )
+
+    def _index_keys(
+        self,
+        pattern_id: str,
+        preconditions: Iterable[str],
+        tags: Iterable[str],
+        domains: Iterable[str],
+        goal_type: str | None,
+        composition_type: str,
+    ) -> None:
+        self._indexed_types[pattern_id] = (goal_type, composition_type)
+        self._pending_structures.add(pattern_id)
+        if goal_type is not None:
+            self._goal_index.setdefault(goal_type, set()).add(pattern_id)
+        self._composition_index.setdefault(composition_type, set()).add(pattern_id)
+        tag_set = frozenset(tags)
+        self._indexed_tags[pattern_id] = tag_set
+        for tag in tag_set:
+            self._tag_index.setdefault(tag, set()).add(pattern_id)
+        domain_set = set(domains)
+        self._indexed_domains[pattern_id] = domain_set
+        for domain in domain_set:
+            self._domain_index.setdefault(domain, set()).add(pattern_id)
+
+        required = set(preconditions)
+        if not required:
+            self._unconditional.add(pattern_id)
+            return
+        self._masks[pattern_id] = self._vocabulary.mask(required)
+        self._sizes[pattern_id] = len(required)
+        for feature in required:
+            self._precondition_index.setdefault(feature, set()).add(pattern_id)
+
+    def _unindex(self, pattern_id: str) -> None:
+        self._unconditional.discard(pattern_id)
+        self._sizes.pop(pattern_id, None)
+        for feature in self._vocabulary.names(self._masks.pop(pattern_id, 0)):
+            _discard_posting(self._precondition_index, feature, pattern_id)
+        for tag in self._indexed_tags.pop(pattern_id, ()):
+            _discard_posting(self._tag_index, tag, pattern_id)
+        for domain in self._indexed_domains.pop(pattern_id, ()):
+            _discard_posting(self._domain_index, domain, pattern_id)
+        goal_type, composition_type = self._indexed_types.pop(pattern_id)
+        if goal_type is not None:
+            _discard_posting(self._goal_index, goal_type, pattern_id)
+        _discard_posting(self._composition_index, composition_type, pattern_id)
+        self._pending_structures.discard(pattern_id)
+        self._pending_hashes.discard(pattern_id)
+        self._embeddings.pop(pattern_id, None)
+        graph = self._structure_graphs.pop(pattern_id, None)
+        if graph is not None:
+            _discard_posting(self._signature_index, graph.signature, pattern_id)
+        graph_hash = self._structure_hashes.pop(pattern_id, None)
+        if graph_hash is not None:
+            _discard_posting(self._hash_index, graph_hash, pattern_id)
+
+    def _instantiation_added(self, pattern: Pattern, inst: Instantiation) -> None:
+        """Called by Pattern.add_instantiation for patterns held by this store."""
+        if self._patterns.get(pattern.id) is not pattern:
+            return
+        self._indexed_domains[pattern.id].add(inst.domain)
+        self._domain_index.setdefault(inst.domain, set()).add(pattern.id)
+
+    def _in_store_order(self, pattern_ids: Iterable[str]) -> list[Pattern]:
+        return [self._patterns[pid] for pid in sorted(pattern_ids, key=self._seq.__getitem__)]
 
     def search_by_tag(self, *tags: str) -> list[Pattern]:
-        """Find patterns that have all the given tags."""
-        tag_set = set(tags)
-        return [p for p in self._patterns.values() if tag_set.issubset(set(p.tags))]
+        """
+        Find patterns that have all the given tags.
+
+        Posting lists are intersected rarest tag first, so the cost is
+        bounded by the least common tag's postings.
+        """
+        if not tags:
+            return self.all_patterns
+        postings = []
+        for tag in set(tags):
+            tag_postings = self._tag_index.get(tag)
+            if not tag_postings:
+                return []
+            postings.append(tag_postings)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for other in postings[1:]:
+            result.intersection_update(other)
+            if not result:
+                return []
+        return self._in_store_order(result)
 
     def search_by_domain(self, domain: str) -> list[Pattern]:
         """Find patterns that have been instantiated in a given domain."""
-        return [p for p in self._patterns.values() if domain in p.domains_covered]
+        return self._in_store_order(self._domain_index.get(domain, ()))
+
+    def query(self, query: Query | str) -> list[Pattern]:
+        """
+        Find patterns matching a boolean query over tags, domains,
+        preconditions, goal type and composition type (see query.py).
+
+        Accepts a Query expression or its text form, e.g.
+        'tag:graph AND (domain:compilers OR NOT goal:find)'.
+        """
+        return self._in_store_order(compile_query(query, self).execute())
+
+    def explain(self, query: Query | str) -> str:
+        """Describe the plan query() would run, with cardinality estimates."""
+        return compile_query(query, self).explain()
+
+    def _postings(self, index: str, key: str) -> set[str]:
+        """Posting list of one index ("tag", "domain", "precondition", "goal", "composition")."""
+        indexes = {
+            "tag": self._tag_index,
+            "domain": self._domain_index,
+            "precondition": self._precondition_index,
+            "goal": self._goal_index,
+            "composition": self._composition_index,
+        }
+        return indexes[index].get(key, set())
 
     def save(self, path: str | Path) -> None:
         """Serialize the store to a JSON file."""
@@ -117,13 +724,69 @@ class PatternStore:
             data.append(_pattern_to_dict(p))
         path.write_text(json.dumps(data, indent=2))
 
-    def load(self, path: str | Path) -> None:
-        """Load patterns from a JSON file."""
-        path = Path(path)
-        data = json.loads(path.read_text())
-        for item in data:
-            pattern = _dict_to_pattern(item)
-            self._patterns[pattern.id] = pattern
+    def load(
+        self,
+        path: str | Path,
+        progress: Callable[[int, int], None] | None = None,
+        chunk_size: int = 1 << 16,
+        dedup: bool = False,
+    ) -> None:
+        """
+        Load patterns from a JSON file.
+
+        The top-level array is parsed incrementally and each pattern is added
+        as soon as it is decoded, so peak memory is bounded by the largest
+        single pattern rather than the whole file.
+
+        Args:
+            path: JSON file written by save()
+            progress: Called after each pattern with (patterns_loaded, bytes_read)
+            chunk_size: Number of bytes read from the file at a time
+            dedup: Merge each pattern into an already stored duplicate instead
+                of adding it (see dedup()); a stored pattern with the same id
+                is replaced either way
+        """
+        aliases: dict[str, str] = {}
+        try:
+            with open(path, "rb") as fp:
+                for count, (item, bytes_read) in enumerate(_iter_json_array(fp, chunk_size), 1):
+                    self._load_pattern(_dict_to_pattern(item), dedup, aliases)
+                    if progress is not None:
+                        progress(count, bytes_read)
+        finally:
+            # Merged ids may be referenced by patterns loaded before or after them
+            self._redirect_related(aliases)
+
+    def save_binary(self, path: str | Path) -> None:
+        """Serialize the store to the compact binary format (see binary.py)."""
+        with open(path, "wb") as fp:
+            binary.write_patterns(fp, self._patterns.values())
+
+    def load_binary(
+        self,
+        path: str | Path,
+        progress: Callable[[int, int], None] | None = None,
+        dedup: bool = False,
+    ) -> None:
+        """
+        Load patterns from a file written by save_binary().
+
+        Args:
+            path: Binary store file
+            progress: Called after each pattern with (patterns_loaded, bytes_read)
+            dedup: Merge each pattern into an already stored duplicate instead
+                of adding it (see dedup()); a stored pattern with the same id
+                is replaced either way
+        """
+        aliases: dict[str, str] = {}
+        try:
+            with open(path, "rb") as fp:
+                for count, (pattern, bytes_read) in enumerate(binary.iter_file(fp), 1):
+                    self._load_pattern(pattern, dedup, aliases)
+                    if progress is not None:
+                        progress(count, bytes_read)
+        finally:
+            self._redirect_related(aliases)
 
     def __len__(self) -> int:
         return len(self._patterns)
@@ -136,6 +799,90 @@ class PatternStore:
 # Serialization helpers
 # ---------------------------------------------------------------------------
 
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _iter_json_array(fp: BinaryIO, chunk_size: int) -> Iterator[tuple[Any, int]]:
+    """
+    Decode a top-level JSON array one element at a time.
+
+    Yields (element, bytes_read) pairs. Only the unparsed tail of the file
+    is kept in memory, plus whatever a single element needs.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    bytes_read = 0
+    eof = False
+
+    def fill(min_size: int = 0) -> None:
+        nonlocal buf, pos, bytes_read, eof
+        # Growing reads keep re-parsing of one large element amortized linear
+        chunk = fp.read(max(chunk_size, min_size))
+        bytes_read += len(chunk)
+        eof = not chunk
+        buf = buf[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+    def skip_whitespace() -> None:
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if buf[pos:pos + 1] != "[":
+        raise ValueError("expected a JSON array at the top level")
+    pos += 1
+
+    first = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buf):
+            raise ValueError("unterminated JSON array")
+        if buf[pos] == "]":
+            pos += 1
+            skip_whitespace()
+            if pos < len(buf):
+                raise ValueError(f"extra data after the JSON array at offset {bytes_read - len(buf) + pos}")
+            return
+        if not first:
+            if buf[pos] != ",":
+                raise ValueError(f"expected ',' or ']' at offset {bytes_read - len(buf) + pos}")
+            pos += 1
+            skip_whitespace()
+        first = False
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill(len(buf) - pos)
+                continue
+            if end == len(buf) and not eof:
+                # A scalar may continue past the buffer; make sure it is complete
+                fill(len(buf) - pos)
+                continue
+            break
+        pos = end
+        yield item, bytes_read
+
+
+def _write_json_array(fp: TextIO, items: Iterable[Any]) -> None:
+    """Write items as a JSON array, formatted like json.dumps(list(items), indent=2)."""
+    first = True
+    for item in items:
+        fp.write("[\n  " if first else ",\n  ")
+        fp.write(json.dumps(item, indent=2).replace("\n", "\n  "))
+        first = False
+    fp.write("[]" if first else "\n]")
+
+
 def _pattern_to_dict(pattern: Pattern) -> dict:
     """Convert a Pattern to a JSON-serializable dict."""
     from .core import Postcondition
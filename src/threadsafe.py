@@ -0,0 +1,192 @@
+"""
+Thread-safe PatternStore for concurrent readers and writers.
+
+ThreadSafePatternStore guards a PatternStore with a readers-writer lock:
+any number of threads may match and search at once, while add/remove
+(and the index update behind Pattern.add_instantiation) run alone. Each
+write is atomic with respect to readers, so a reader never sees a
+half-indexed pattern or a dict changing size under iteration.
+"""
+
+from __future__ import annotations
+
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, TypeVar
+
+from .core import Instantiation, Pattern
+from .scoring import Scorer
+from .similarity import SimilarityIndex
+from .store import PatternStore
+
+F = TypeVar("F", bound=Callable)
+
+
+class ReadWriteLock:
+    """
+    A writer-preferring readers-writer lock.
+
+    Read sections may nest within a thread, as may write sections, and a
+    thread holding the write side may read. Once a writer is waiting, new
+    readers queue behind it, so a steady stream of reads cannot starve
+    writes. A read section cannot be upgraded to a write.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    def acquire_read(self) -> None:
+        if getattr(self._local, "writes", 0):
+            return
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            # Nested read in a thread that already holds the lock
+            self._local.depth = depth + 1
+            return
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        self._local.depth = 1
+
+    def release_read(self) -> None:
+        if getattr(self._local, "writes", 0):
+            return
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        writes = getattr(self._local, "writes", 0)
+        if writes:
+            self._local.writes = writes + 1
+            return
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        self._local.writes = 1
+
+    def release_write(self) -> None:
+        self._local.writes -= 1
+        if self._local.writes:
+            return
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def _reader(method: F) -> F:
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.reading():
+            return method(self, *args, **kwargs)
+    return wrapper  # type: ignore[return-value]
+
+
+def _writer(method: F) -> F:
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.writing():
+            return method(self, *args, **kwargs)
+    return wrapper  # type: ignore[return-value]
+
+
+class ThreadSafePatternStore(PatternStore):
+    """
+    A PatternStore safe to share between threads.
+
+    Reads (get, match, match_many, match_structure, find_by_structure,
+    similar, best_match, searches, query, save) take the shared side of a
+    ReadWriteLock; add, remove, dedup and domain-index updates take the
+    exclusive side. load() and load_binary() lock per pattern, so
+    matches keep being served while a large file loads.
+
+    The store's derived snapshots (e.g. the vectorized score matrix) may be
+    built by a reader; concurrent readers can at worst build the same
+    snapshot twice. Compiled pattern structures and embeddings are built
+    incrementally, so readers take turns compiling them (the compile lock
+    is re-entrant, as hashing compiles first).
+    """
+
+    def __init__(self, vectorized: bool = False, scorer: Scorer | None = None) -> None:
+        self._lock = ReadWriteLock()
+        self._compile_lock = threading.RLock()
+        super().__init__(vectorized=vectorized, scorer=scorer)
+
+    add = _writer(PatternStore.add)
+    remove = _writer(PatternStore.remove)
+    dedup = _writer(PatternStore.dedup)
+    _load_pattern = _writer(PatternStore._load_pattern)
+    _redirect_related = _writer(PatternStore._redirect_related)
+
+    def _instantiation_added(self, pattern: Pattern, inst: Instantiation) -> None:
+        with self._lock.writing():
+            super()._instantiation_added(pattern, inst)
+
+    def _compile_pending_structures(self) -> None:
+        with self._compile_lock:
+            super()._compile_pending_structures()
+
+    def _hash_pending_structures(self) -> None:
+        with self._compile_lock:
+            super()._hash_pending_structures()
+
+    def _similarity_index(self) -> SimilarityIndex:
+        with self._compile_lock:
+            return super()._similarity_index()
+
+    get = _reader(PatternStore.get)
+    match = _reader(PatternStore.match)
+    match_structure = _reader(PatternStore.match_structure)
+    find_by_structure = _reader(PatternStore.find_by_structure)
+    similar = _reader(PatternStore.similar)
+    best_match = _reader(PatternStore.best_match)
+    match_many = _reader(PatternStore.match_many)
+    search_by_tag = _reader(PatternStore.search_by_tag)
+    search_by_domain = _reader(PatternStore.search_by_domain)
+    query = _reader(PatternStore.query)
+    explain = _reader(PatternStore.explain)
+    save = _reader(PatternStore.save)
+    save_binary = _reader(PatternStore.save_binary)
+
+    @property
+    def all_patterns(self) -> list[Pattern]:
+        with self._lock.reading():
+            return list(self._patterns.values())
+
+    def __len__(self) -> int:
+        with self._lock.reading():
+            return len(self._patterns)
+
+    def __repr__(self) -> str:
+        return f"ThreadSafePatternStore({len(self)} patterns)"
@@ -0,0 +1,73 @@
+"""
+Vectorized scoring backend for the PatternStore.
+
+Builds a dense pattern × feature matrix from the store's precondition
+bitmasks and scores every pattern against a problem in one matrix-vector
+product:
+
+    score = (M · v) / |preconditions|
+
+NumPy is optional. When it is not installed, HAS_NUMPY is False and the
+store keeps using its pure-Python scoring path.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+HAS_NUMPY = np is not None
+
+
+class VectorizedScorer:
+    """
+    A snapshot of a store's conditional patterns as a 0/1 feature matrix.
+
+    The snapshot is immutable; the store rebuilds it after add/remove.
+    """
+
+    def __init__(self, pattern_ids: list[str], masks: Iterable[int], n_features: int) -> None:
+        if np is None:
+            raise ImportError("VectorizedScorer requires numpy")
+        self.pattern_ids = pattern_ids
+        self.n_features = n_features
+
+        rows: list[int] = []
+        cols: list[int] = []
+        for row, mask in enumerate(masks):
+            while mask:
+                low = mask & -mask
+                rows.append(row)
+                cols.append(low.bit_length() - 1)
+                mask ^= low
+
+        self.matrix = np.zeros((len(pattern_ids), n_features), dtype=np.uint8)
+        self.matrix[rows, cols] = 1
+        self.sizes = self.matrix.sum(axis=1, dtype=np.int64).astype(np.float64)
+
+    def problem_vector(self, problem_mask: int):
+        """Encode a problem bitmask as an int32 feature vector."""
+        vector = np.zeros(self.n_features, dtype=np.int32)
+        bit = 0
+        while problem_mask:
+            if problem_mask & 1 and bit < self.n_features:
+                vector[bit] = 1
+            problem_mask >>= 1
+            bit += 1
+        return vector
+
+    def scores(self, problem_mask: int):
+        """Score of every pattern (in pattern_ids order) against the problem."""
+        hits = self.matrix @ self.problem_vector(problem_mask)
+        return hits / self.sizes
+
+    def above(self, problem_mask: int, threshold: float) -> list[tuple[float, str]]:
+        """(score, pattern_id) pairs for patterns scoring at least threshold."""
+        scores = self.scores(problem_mask)
+        selected = np.flatnonzero(scores >= threshold)
+        ids = self.pattern_ids
+        return [(float(scores[i]), ids[i]) for i in selected.tolist()]
@@ -0,0 +1,97 @@
+"""
+Seeded random structures, problems and patterns shared by the tests.
+
+Vocabularies are kept small so random problems and patterns overlap often,
+and structures small enough to check against brute force.
+"""
+
+import random
+
+from src.core import (
+    CompositionType,
+    Entity,
+    Goal,
+    GoalType,
+    Instantiation,
+    Operation,
+    Pattern,
+    Problem,
+    Relation,
+    Solution,
+    Step,
+    Structure,
+    Transformation,
+)
+
+FEATURES = [
+    "recursive_decomposability", "linear_chain", "tree", "cycle", "bipartite",
+    "iterative", "has_contractive_map", "independent_subproblems", "f1", "f2", "f3", "f4",
+]
+ENTITY_TYPES = ["collection", "element", "operation", "container"]
+RELATION_TYPES = ["contains", "ordered_before", "depends_on", "maps_to"]
+DOMAINS = ["math", "se", "ml"]
+TAGS = ["a", "b", "c", "d"]
+
+
+def random_structure(rng: random.Random, n: int | None = None) -> Structure:
+    """Up to 6 entities (or exactly n) and up to 2n random relations, self-loops included."""
+    n = rng.randint(0, 6) if n is None else n
+    entities = [Entity(f"e{i}", rng.choice(ENTITY_TYPES)) for i in range(n)]
+    relations = [
+        Relation(f"e{rng.randrange(n)}", f"e{rng.randrange(n)}", rng.choice(RELATION_TYPES))
+        for _ in range(rng.randint(0, 2 * n))
+    ] if n else []
+    return Structure(entities, relations)
+
+
+def random_problem(rng: random.Random, i: int = 0) -> Problem:
+    return Problem(
+        f"prob{i}",
+        "problem",
+        random_structure(rng),
+        goal=Goal(rng.choice(list(GoalType)), "e0", "solved"),
+        tags=rng.sample(FEATURES, rng.randint(0, 4)),
+    )
+
+
+def random_pattern(rng: random.Random, i: int) -> Pattern:
+    steps = [Step(rng.choice(list(Operation)), {"k": i}, "b", "r") for _ in range(rng.randint(0, 3))]
+    solution = Solution(
+        f"sol{i}",
+        "solution",
+        preconditions=rng.sample(FEATURES, rng.randint(0, 4)),
+        transformation=Transformation(steps, rng.choice(list(CompositionType))),
+    )
+    return Pattern(
+        f"pat{i:04d}",
+        f"Pattern {i}",
+        "description",
+        random_problem(rng, i),
+        solution,
+        instantiations=[
+            Instantiation(rng.choice(DOMAINS), "concrete problem", "concrete solution")
+            for _ in range(rng.randint(0, 2))
+        ],
+        tags=rng.sample(TAGS, rng.randint(0, 3)),
+    )
+
+
+def random_patterns(seed: int, n: int) -> list[Pattern]:
+    rng = random.Random(seed)
+    return [random_pattern(rng, i) for i in range(n)]
+
+
+def relabel(structure: Structure, rng: random.Random) -> Structure:
+    """An isomorphic copy with fresh entity ids and shuffled entity and relation order."""
+    ids = sorted({e.id for e in structure.entities} | {x for r in structure.relations for x in (r.source, r.target)})
+    rename = dict(zip(ids, rng.sample([f"z{i}" for i in range(len(ids))], len(ids))))
+    entities = [Entity(rename[e.id], e.type) for e in structure.entities]
+    relations = [Relation(rename[r.source], rename[r.target], r.type) for r in structure.relations]
+    rng.shuffle(entities)
+    rng.shuffle(relations)
+    return Structure(entities, relations)
+
+
+def result_key(results) -> list[tuple]:
+    """MatchResults reduced to comparable tuples."""
+    return [(r.pattern.id, r.score, r.matched_features, r.unmatched_preconditions) for r in results]
@@ -0,0 +1,203 @@
+"""Parallel, thread-safe and asyncio stores against a plain PatternStore."""
+
+import asyncio
+import random
+import threading
+import time
+
+import pytest
+
+from factories import DOMAINS, TAGS, random_pattern, random_patterns, random_problem, result_key
+from src.aio import AsyncPatternStore
+from src.core import Instantiation
+from src.parallel import ShardedMatcher
+from src.scoring import IDF
+from src.store import PatternStore
+from src.threadsafe import ReadWriteLock, ThreadSafePatternStore
+
+
+def test_sharded_matcher_matches_the_store_and_follows_edits():
+    rng = random.Random(18)
+    store = PatternStore()
+    for p in random_patterns(18, 300):
+        store.add(p)
+    with ShardedMatcher(store, workers=3) as matcher:
+        for _ in range(10):
+            problem = random_problem(rng)
+            for threshold in (0.0, 0.5, 1.0):
+                for k in (None, 5):
+                    assert result_key(matcher.match(problem, threshold, k)) == result_key(store.match(problem, threshold, k))
+        store.remove("pat0003")
+        store.add(random_pattern(rng, 999))
+        problems = [random_problem(rng) for _ in range(10)]
+        for problem, results in zip(problems, matcher.match_many(problems, 0.3, 4)):
+            assert result_key(results) == result_key(store.match(problem, 0.3, 4))
+        store.scorer = IDF()  # weighted scorers are matched in-process
+        problem = random_problem(rng)
+        assert result_key(matcher.match(problem, 0.3)) == result_key(store.match(problem, 0.3))
+
+
+def test_read_write_lock_nests_and_excludes_writers():
+    lock = ReadWriteLock()
+    with lock.reading(), lock.reading():
+        pass
+    with lock.writing(), lock.writing(), lock.reading():
+        pass
+
+    inside = {"readers": 0, "writers": 0}
+    overlaps = []
+    guard = threading.Lock()
+
+    def enter(kind, section):
+        for _ in range(200):
+            with section():
+                with guard:
+                    inside[kind] += 1
+                    if inside["writers"] > 1 or (inside["writers"] and inside["readers"]):
+                        overlaps.append(dict(inside))
+                time.sleep(0)
+                with guard:
+                    inside[kind] -= 1
+
+    threads = [threading.Thread(target=enter, args=("writers", lock.writing)) for _ in range(3)]
+    threads += [threading.Thread(target=enter, args=("readers", lock.reading)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not overlaps
+
+
+def test_thread_safe_store_survives_concurrent_reads_and_writes():
+    patterns = random_patterns(19, 400)
+    store = ThreadSafePatternStore(vectorized=True)
+    for p in patterns[:200]:
+        store.add(p)
+    errors = []
+    done = threading.Event()
+
+    def read(seed):
+        rng = random.Random(seed)
+        try:
+            while not done.is_set():
+                store.match(random_problem(rng), 0.3, 5)
+                store.search_by_tag(rng.choice(TAGS))
+                store.search_by_domain(rng.choice(DOMAINS))
+                store.query("tag:a OR NOT domain:ml")
+                len(store.all_patterns)
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    readers = [threading.Thread(target=read, args=(i,)) for i in range(4)]
+    for t in readers:
+        t.start()
+    rng = random.Random(19)
+    try:
+        for i, p in enumerate(patterns[200:]):
+            store.add(p)
+            store.remove(patterns[i].id)
+            rng.choice(store.all_patterns).add_instantiation(Instantiation(rng.choice(DOMAINS + ["zz"]), "a", "b"))
+    finally:
+        done.set()
+        for t in readers:
+            t.join()
+    assert not errors
+
+    fresh = PatternStore(vectorized=True)
+    for p in store.all_patterns:
+        fresh.add(p)
+    for _ in range(20):
+        problem = random_problem(rng)
+        assert result_key(store.match(problem, 0.3)) == result_key(fresh.match(problem, 0.3))
+    for tag in TAGS:
+        assert store.search_by_tag(tag) == fresh.search_by_tag(tag)
+    for domain in DOMAINS + ["zz"]:
+        assert store.search_by_domain(domain) == fresh.search_by_domain(domain)
+
+
+def counting_match(store, delay):
+    calls = []
+    match = store.match
+
+    def slow_match(*args):
+        calls.append(args)
+        time.sleep(delay)
+        return match(*args)
+
+    store.match = slow_match
+    return calls
+
+
+def test_amatch_equals_match_and_coalesces_identical_requests():
+    rng = random.Random(20)
+    store = ThreadSafePatternStore()
+    for p in random_patterns(20, 100):
+        store.add(p)
+    astore = AsyncPatternStore(store)
+    problems = [random_problem(rng) for _ in range(5)]
+    expected = [store.match(p, 0.3, 5) for p in problems]
+    calls = counting_match(store, 0.05)
+
+    async def run():
+        single = [await astore.amatch(p, 0.3, 5) for p in problems]
+        del calls[:]
+        shared = await asyncio.gather(*(astore.amatch(problems[0], 0.3, 5) for _ in range(8)))
+        return single, shared
+
+    single, shared = asyncio.run(run())
+    assert [result_key(r) for r in single] == [result_key(r) for r in expected]
+    assert len(calls) == 1 and all(result_key(r) == result_key(expected[0]) for r in shared)
+    assert not astore._inflight
+
+
+def test_amatch_timeout_and_cancellation_leave_nothing_in_flight():
+    store = ThreadSafePatternStore()
+    for p in random_patterns(21, 20):
+        store.add(p)
+    astore = AsyncPatternStore(store)
+    counting_match(store, 0.2)
+    problem = random_problem(random.Random(21))
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await astore.amatch(problem, 0.3, timeout=0.01)
+        task = asyncio.ensure_future(astore.amatch(problem, 0.0))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not astore._inflight
+        assert [p.id async for p in astore.asearch_by_tag("a")] == [p.id for p in store.search_by_tag("a")]
+
+    asyncio.run(run())
+
+
+def test_cancelled_aload_stops_loading(tmp_path):
+    source = PatternStore()
+    for p in random_patterns(22, 300):
+        source.add(p)
+    path = tmp_path / "store.json"
+    source.save(path)
+    store = ThreadSafePatternStore()
+    load_pattern = store._load_pattern
+
+    def slow_load_pattern(*args):
+        time.sleep(0.001)
+        load_pattern(*args)
+
+    store._load_pattern = slow_load_pattern
+    astore = AsyncPatternStore(store)
+
+    async def run():
+        started = asyncio.Event()
+        task = asyncio.ensure_future(astore.aload(path, progress=lambda n, b: started.set()))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        loaded = len(store)
+        await asyncio.sleep(0.05)
+        return loaded
+
+    loaded = asyncio.run(run())
+    assert 0 < loaded < 300 and len(store) == loaded
@@ -0,0 +1,28 @@
+"""FeatureVocabulary bitmasks against plain set operations."""
+
+import random
+
+from src.features import FeatureVocabulary
+
+
+def test_masks_mirror_set_operations():
+    rng = random.Random(7)
+    names = [f"f{i}" for i in range(100)]  # past 64 bits, so masks are big ints
+    vocab = FeatureVocabulary()
+    for _ in range(500):
+        a = set(rng.sample(names, rng.randint(0, 20)))
+        b = set(rng.sample(names, rng.randint(0, 20)))
+        mask_a, mask_b = vocab.mask(a), vocab.mask(b)
+        assert vocab.names(mask_a) == sorted(a)
+        assert vocab.names(mask_a & mask_b) == sorted(a & b)
+        assert (mask_a & mask_b).bit_count() == len(a & b)
+        assert (mask_a & mask_b == mask_a) == (a <= b)
+
+
+def test_positions_are_stable_and_lookups_do_not_intern():
+    vocab = FeatureVocabulary()
+    mask = vocab.mask(["x", "y"])
+    vocab.mask([f"g{i}" for i in range(10)])
+    assert vocab.names(mask) == ["x", "y"] and vocab.bit("x") == 0
+    assert vocab.lookup_mask(["x", "unknown"]) == 1 << vocab.bit("x")
+    assert "unknown" not in vocab and len(vocab) == 12
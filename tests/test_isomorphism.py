@@ -0,0 +1,198 @@
+"""Subgraph isomorphism, structure hashing and dedup against brute force."""
+
+import itertools
+import json
+import random
+from copy import deepcopy
+
+import pytest
+
+from factories import random_patterns, random_problem, random_structure, relabel
+from src.core import Entity, Pattern, Problem, Relation, Solution, Structure
+from src.isomorphism import StructureGraph, find_embedding, is_isomorphic, structure_hash
+from src.store import PatternStore, _pattern_to_dict
+
+
+def is_embedding(mapping, pattern, target):
+    p, t = StructureGraph(pattern), StructureGraph(target)
+    return _preserves(mapping, p, t)
+
+
+def _preserves(mapping, p, t):
+    return (
+        set(mapping) == set(p.types)
+        and len(set(mapping.values())) == len(mapping)
+        and all(t.types.get(mapping[n]) == p.types[n] for n in p.types)
+        and all((mapping[s], mapping[d], r) in t.edges for s, d, r in p.edges)
+    )
+
+
+def brute_force_embeds(pattern, target):
+    p, t = StructureGraph(pattern), StructureGraph(target)
+    nodes = list(p.types)
+    return any(
+        _preserves(dict(zip(nodes, image)), p, t)
+        for image in itertools.permutations(t.types, len(nodes))
+    )
+
+
+def test_find_embedding_agrees_with_brute_force():
+    rng = random.Random(21)
+    found = 0
+    for _ in range(600):
+        pattern = random_structure(rng, rng.randint(0, 4))
+        target = random_structure(rng, rng.randint(0, 6))
+        mapping = find_embedding(pattern, target)
+        assert (mapping is not None) == brute_force_embeds(pattern, target)
+        if mapping is not None:
+            found += 1
+            assert is_embedding(mapping, pattern, target)
+            assert find_embedding(pattern, relabel(target, rng)) is not None
+    assert found > 50
+
+
+def test_is_isomorphic_holds_on_relabelled_copies_only():
+    rng = random.Random(21)
+    for _ in range(300):
+        a = random_structure(rng)
+        assert is_isomorphic(a, relabel(a, rng))
+        b = random_structure(rng, len(StructureGraph(a).types))
+        expected = brute_force_embeds(a, b) and brute_force_embeds(b, a)
+        assert is_isomorphic(a, b) == expected
+    chain = Structure([Entity("a", "x"), Entity("b", "x")], [Relation("a", "b", "next")])
+    assert not is_isomorphic(chain, Structure(chain.entities, [Relation("b", "b", "next")]))
+
+
+def test_match_structure_agrees_with_find_embedding():
+    rng = random.Random(21)
+    patterns = random_patterns(21, 200)
+    store = PatternStore()
+    for p in patterns:
+        store.add(p)
+    for _ in range(20):
+        problem = random_problem(rng)
+        problem.structure = random_structure(rng, 6)
+        target = StructureGraph(problem.structure)
+        size = len(target.types) + len(target.edges)
+        expected = []
+        for p in patterns:
+            graph = StructureGraph(p.problem.structure)
+            if graph.types and find_embedding(graph, target) is not None:
+                expected.append(((len(graph.types) + len(graph.edges)) / size, p.id))
+        expected.sort(key=lambda item: (-item[0], item[1]))
+        results = store.match_structure(problem)
+        assert [(m.coverage, m.pattern.id) for m in results] == expected
+        for m in results:
+            assert is_embedding(m.mapping, m.pattern.problem.structure, problem.structure)
+        assert [m.pattern.id for m in store.match_structure(problem, top_k=3)] == [i for _, i in expected[:3]]
+
+
+def test_structure_hash_is_invariant_and_follows_edits():
+    rng = random.Random(22)
+    structures = [random_structure(rng, rng.randint(0, 4)) for _ in range(300)]
+    for a in structures:
+        assert structure_hash(a) == structure_hash(relabel(a, rng)) == structure_hash(StructureGraph(a))
+    for a, b in itertools.combinations(structures[:150], 2):
+        if is_isomorphic(a, b):
+            assert structure_hash(a) == structure_hash(b)
+    s = structures[0]
+    before = structure_hash(s)
+    s.entities.append(Entity("new", "solo"))
+    assert structure_hash(s) == structure_hash(StructureGraph(s)) != before
+
+
+def dedup_key(p):
+    transformation = p.solution.transformation
+    return (
+        p.problem.goal.type,
+        frozenset(p.solution.preconditions),
+        tuple(s.operation for s in transformation.steps),
+        transformation.composition_type,
+    )
+
+
+def duplicated_patterns(seed):
+    """Random patterns plus relabelled copies of some, under new ids and with related references."""
+    rng = random.Random(seed)
+    patterns = random_patterns(seed, 80)
+    for i in range(40):
+        copy = deepcopy(rng.choice(patterns[:80]))
+        copy.id = f"dup{i:02d}"
+        copy.problem.structure = relabel(copy.problem.structure, rng)
+        copy.tags = ["copy"]
+        patterns.append(copy)
+    for p in patterns:
+        p.related_patterns = [q.id for q in rng.sample(patterns, 3) if q is not p][:2]
+    return patterns
+
+
+def test_find_by_structure_agrees_with_a_linear_scan():
+    rng = random.Random(22)
+    patterns = duplicated_patterns(22)
+    store = PatternStore()
+    for p in patterns:
+        store.add(p)
+    for p in rng.sample(patterns, 40):
+        query = relabel(p.problem.structure, rng)
+        expected = [q.id for q in patterns if is_isomorphic(q.problem.structure, query)]
+        assert [q.id for q in store.find_by_structure(query)] == expected
+
+
+def test_dedup_merges_every_duplicate_once_and_redirects_references():
+    patterns = duplicated_patterns(23)
+    store = PatternStore()
+    for p in patterns:
+        store.add(p)
+    survivors = {}
+    for p in patterns:
+        survivors[p.id] = next(
+            (s for s in patterns[: patterns.index(p)]
+             if survivors[s.id] == s.id and dedup_key(s) == dedup_key(p)
+             and is_isomorphic(s.problem.structure, p.problem.structure)),
+            p,
+        ).id
+    kept = [pid for pid, survivor in survivors.items() if pid == survivor]
+
+    assert store.dedup() == len(patterns) - len(kept)
+    assert [p.id for p in store.all_patterns] == kept
+    assert store.dedup() == 0
+    for p in store.all_patterns:
+        assert set(p.related_patterns) <= set(kept) - {p.id}
+    for pid, survivor in survivors.items():
+        if pid != survivor:
+            assert "copy" in store.get(survivor).tags
+
+
+def chain(pid, n):
+    structure = Structure(
+        [Entity(f"{pid}{i}", "t") for i in range(n)],
+        [Relation(f"{pid}{i}", f"{pid}{i + 1}", "ordered_before") for i in range(n - 1)],
+    )
+    return Pattern(pid, pid, "", Problem(pid, pid, structure), Solution(pid, pid))
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_load_with_dedup_replaces_the_same_id_and_redirects(tmp_path, binary):
+    store = PatternStore()
+    for p in (chain("X", 2), chain("Y", 4), chain("Z", 6)):
+        store.add(p)
+    store.get("Z").related_patterns = ["X"]
+    source = PatternStore()
+    source.add(chain("X", 4))  # a new X, duplicating Y
+    path = tmp_path / "store"
+    (source.save_binary if binary else source.save)(path)
+    (store.load_binary if binary else store.load)(path, dedup=True)
+    assert store.get("X") is None
+    assert store.get("Z").related_patterns == ["Y"]
+
+
+def test_a_later_pattern_under_a_merged_id_is_kept(tmp_path):
+    store = PatternStore()
+    store.add(chain("Y", 4))
+    store.add(chain("Z", 6))
+    store.get("Z").related_patterns = ["X"]
+    path = tmp_path / "store.json"
+    path.write_text(json.dumps([_pattern_to_dict(chain("X", 4)), _pattern_to_dict(chain("X", 3))]))
+    store.load(path, dedup=True)
+    assert store.get("X").problem.structure == chain("X", 3).problem.structure
+    assert store.get("Z").related_patterns == ["X"]
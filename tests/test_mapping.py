@@ -0,0 +1,144 @@
+"""DomainMapping inverses, bulk abstraction and compiled instantiation."""
+
+import copy
+import dataclasses
+import json
+import pickle
+import random
+
+import pytest
+
+from src.core import Operation, Solution, Step, Transformation
+from src.mapping import DomainMapping, abstract, abstract_many, instantiate, read_jsonl
+
+
+def test_inverse_maps_track_edits_and_reassignment():
+    rng = random.Random(15)
+    mapping = DomainMapping("d", {"list": "collection"}, {"bsearch": "search"})
+    keys = [f"k{i}" for i in range(5)]
+    values = ["search", "fix", "x", "y"]
+    for _ in range(2000):
+        roll = rng.random()
+        if roll < 0.4:
+            mapping.operation_map[rng.choice(keys)] = rng.choice(values)
+        elif roll < 0.55 and mapping.operation_map:
+            del mapping.operation_map[rng.choice(list(mapping.operation_map))]
+        elif roll < 0.6:
+            mapping.operation_map = {k: rng.choice(values) for k in rng.sample(keys, 3)}
+        # Non-injective maps invert to the last concrete name, in dict order
+        assert mapping.inverse_operation_map == {v: k for k, v in mapping.operation_map.items()}
+        preimages = {}
+        for k, v in mapping.operation_map.items():
+            preimages.setdefault(v, []).append(k)
+        assert mapping.operation_preimages == {v: tuple(ks) for v, ks in preimages.items()}
+
+
+def test_reinserting_a_key_changes_a_non_injective_inverse():
+    mapping = DomainMapping("d", {"a": "x", "b": "x"})
+    assert mapping.inverse_type_map == {"x": "b"}
+    del mapping.type_map["a"]
+    mapping.type_map["a"] = "x"  # same contents, new order
+    assert mapping.inverse_type_map == {"x": "a"}
+    assert mapping.type_preimages == {"x": ("b", "a")}
+
+
+def test_assigned_maps_are_kept_and_derived_maps_are_copies():
+    mapping = DomainMapping("d")
+    type_map = {"a": "x"}
+    mapping.type_map = type_map
+    assert mapping.type_map is type_map
+    type_map["b"] = "y"
+    assert mapping.inverse_type_map == {"x": "a", "y": "b"}
+    mapping.inverse_type_map["z"] = "q"
+    assert "z" not in mapping.inverse_type_map
+
+
+def test_caches_do_not_leak_into_copies_or_fields():
+    mapping = DomainMapping("d", {"list": "collection"}, {"bsearch": "search"})
+    mapping.inverse_type_map
+    mapping.compile().instantiate(Solution("s", "s"))
+    assert dataclasses.asdict(mapping) == {
+        "domain": "d", "type_map": {"list": "collection"}, "operation_map": {"bsearch": "search"}, "axioms": {},
+    }
+    for copied in (pickle.loads(pickle.dumps(mapping)), copy.deepcopy(mapping)):
+        assert copied == mapping
+        assert copied.inverse_operation_map == {"search": "bsearch"}
+    json.dumps(mapping.inverse_operation_map)
+    json.dumps(mapping.type_preimages)
+
+
+def random_description(rng, i):
+    n = rng.randint(1, 5)
+    return {
+        "id": f"c{i}",
+        "name": f"concrete {i}",
+        "entities": [{"id": f"x{j}", "type": rng.choice(["list", "node", "queue"])} for j in range(n)],
+        "relations": [
+            {"source": f"x{rng.randrange(n)}", "target": f"x{rng.randrange(n)}", "type": rng.choice(["holds", "next"])}
+            for _ in range(rng.randint(0, n))
+        ],
+        "constraints": [{"predicate": "sorted", "over": ["x0"]}],
+        "goal": {"type": "find", "target": "x0", "predicate": "found"},
+        "tags": ["t"],
+    }
+
+
+def test_abstract_many_equals_abstract_per_description(tmp_path):
+    rng = random.Random(16)
+    mapping = DomainMapping("d", {"list": "collection", "holds": "contains", "next": "ordered_before"})
+    descriptions = [random_description(rng, i) for i in range(100)]
+    path = tmp_path / "problems.jsonl"
+    path.write_text("\n\n".join(json.dumps(d) for d in descriptions) + "\n")
+
+    problems = list(abstract_many(read_jsonl(path), mapping))
+    assert problems == [abstract(d, mapping) for d in descriptions]
+    # Each distinct abstract type is one shared string object
+    types = {}
+    for e in (e for p in problems for e in p.structure.entities):
+        assert types.setdefault(e.type, e.type) is e.type
+
+
+def test_abstract_many_snapshots_the_mapping():
+    mapping = DomainMapping("d", {"list": "collection"})
+    stream = abstract_many([random_description(random.Random(1), i) for i in range(2)], mapping)
+    first = next(stream)
+    mapping.type_map["list"] = "changed"
+    second = next(stream)
+    assert "changed" not in {e.type for p in (first, second) for e in p.structure.entities}
+
+
+def test_read_jsonl_reports_the_bad_line(tmp_path):
+    path = tmp_path / "bad.jsonl"
+    path.write_text('{"id": "a"}\n{oops\n')
+    with pytest.raises(ValueError, match=":2:"):
+        list(read_jsonl(path))
+
+
+def test_compiled_mapping_matches_instantiate_through_edits():
+    rng = random.Random(17)
+    ops = list(Operation)
+    mapping = DomainMapping("d")
+    compiled = mapping.compile(maxsize=4)
+    solutions = [
+        Solution(f"s{i}", "s", transformation=Transformation([Step(rng.choice(ops)) for _ in range(3)]))
+        for i in range(6)  # more solutions than cache slots, so entries are evicted
+    ]
+    for _ in range(2000):
+        roll = rng.random()
+        if roll < 0.2:
+            mapping.operation_map = {f"c{rng.randrange(3)}": rng.choice(ops).value}
+        elif roll < 0.35:
+            mapping.operation_map[f"k{rng.randrange(5)}"] = rng.choice(ops).value
+        elif roll < 0.4 and mapping.operation_map:
+            mapping.operation_map.pop(next(iter(mapping.operation_map)))
+        solution = rng.choice(solutions)
+        assert compiled.instantiate(solution) == instantiate(solution, mapping)
+    assert len(compiled) <= 4 and compiled.hits and mapping.compile(maxsize=4) is compiled
+
+
+def test_compiled_steps_are_fresh_dicts():
+    mapping = DomainMapping("d", operation_map={"bsearch": "search"})
+    solution = Solution("s", "s", transformation=Transformation([Step(Operation.SEARCH)]))
+    compiled = mapping.compile()
+    compiled.instantiate(solution)[0]["operation"] = "mutated"
+    assert compiled.instantiate(solution)[0]["operation"] == "bsearch"
@@ -0,0 +1,92 @@
+"""PatternStore.match against the original linear-scan scorer."""
+
+import random
+
+import pytest
+
+from factories import random_pattern, random_patterns, random_problem, result_key
+from src.store import PatternStore
+
+THRESHOLDS = (0.0, 0.3, 0.5, 1.0)
+
+
+def baseline_match(patterns, problem, threshold=0.5):
+    """The pre-index scorer: fraction of preconditions met, 0.1 for none."""
+    features = set(problem.structural_features) | set(problem.tags)
+    results = []
+    for p in patterns:
+        required = set(p.solution.preconditions)
+        if not required:
+            results.append((p.id, 0.1, [], []))
+            continue
+        matched = required & features
+        score = len(matched) / len(required)
+        if score >= threshold:
+            results.append((p.id, score, sorted(matched), sorted(required - matched)))
+    results.sort(key=lambda r: (-r[1], r[0]))
+    return results
+
+
+def test_match_agrees_with_baseline_after_adds_and_removes():
+    rng = random.Random(1)
+    for _ in range(20):
+        patterns = [random_pattern(rng, i) for i in range(rng.randint(0, 60))]
+        store = PatternStore()
+        for p in patterns:
+            store.add(p)
+        for p in patterns[:5]:
+            store.remove(p.id)
+        live = patterns[5:]
+        for p in live[:3]:
+            store.add(p)  # re-adding replaces in place
+        for _ in range(5):
+            problem = random_problem(rng)
+            for threshold in THRESHOLDS:
+                assert result_key(store.match(problem, threshold)) == baseline_match(live, problem, threshold)
+
+
+def test_top_k_and_best_match_are_prefixes_of_match():
+    rng = random.Random(5)
+    store = PatternStore()
+    for p in random_patterns(5, 80):
+        store.add(p)
+    for _ in range(30):
+        problem = random_problem(rng)
+        full = store.match(problem, 0.2)
+        for k in (0, 1, 2, 5, 1000):
+            assert result_key(store.match(problem, 0.2, top_k=k)) == result_key(full[:k])
+        best = store.best_match(problem, 0.2)
+        assert (best is None and not full) or best.pattern.id == full[0].pattern.id
+
+
+def test_match_many_equals_one_match_per_problem():
+    rng = random.Random(6)
+    store = PatternStore()
+    for p in random_patterns(6, 80):
+        store.add(p)
+    problems = [random_problem(rng) for _ in range(30)]
+    problems += problems[:5]  # repeated feature sets share one scoring pass
+    for k in (None, 0, 3):
+        for problem, results in zip(problems, store.match_many(problems, 0.3, k)):
+            assert result_key(results) == result_key(store.match(problem, 0.3, k))
+
+
+def test_vectorized_scoring_matches_bitmask_scoring():
+    pytest.importorskip("numpy")
+    rng = random.Random(8)
+    for _ in range(10):
+        patterns = [random_pattern(rng, i) for i in range(rng.randint(0, 120))]
+        plain, vectorized = PatternStore(), PatternStore(vectorized=True)
+        for p in patterns:
+            plain.add(p)
+            vectorized.add(p)
+        for p in patterns[:7]:
+            plain.remove(p.id)
+            vectorized.remove(p.id)
+        for _ in range(10):
+            problem = random_problem(rng)
+            for threshold in THRESHOLDS:
+                for k in (None, 3):
+                    got = vectorized.match(problem, threshold, k)
+                    assert result_key(got) == result_key(plain.match(problem, threshold, k))
+                    assert all(type(r.score) is float for r in got)
@@ -0,0 +1,149 @@
+"""Round trips through every store file format."""
+
+import io
+import json
+import random
+
+import pytest
+
+from factories import random_patterns, random_problem, result_key
+from src import binary
+from src.core import Entity
+from src.mapped import MappedPatternStore
+from src.sqlite_store import SQLitePatternStore
+from src.store import PatternStore, _iter_json_array, _pattern_to_dict
+
+
+def dump(patterns):
+    return [_pattern_to_dict(p) for p in patterns]
+
+
+def store_of(patterns):
+    store = PatternStore()
+    for p in patterns:
+        store.add(p)
+    return store
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 4096])
+def test_streaming_json_array_matches_json_loads(chunk_size):
+    arrays = [
+        [],
+        [1, 2, 3],
+        # Multi-byte characters and brackets inside strings straddle chunk boundaries
+        [{"a": "é" * 5, "b": [1, 2.5e3, None, True]}, 12345, "x,]", "\\\"["],
+        list(range(50)),
+    ]
+    for data in arrays:
+        for indent in (None, 2):
+            text = json.dumps(data, indent=indent, ensure_ascii=False).encode()
+            items = [item for item, _ in _iter_json_array(io.BytesIO(b"  " + text + b"\n"), chunk_size)]
+            assert items == data
+
+
+@pytest.mark.parametrize("bad", [b"", b"{}", b"[1,2", b"[1 2]", b"[1,]", b"[1] 2", b"[1]]"])
+def test_streaming_json_array_rejects_malformed_input(bad):
+    with pytest.raises(ValueError):
+        list(_iter_json_array(io.BytesIO(bad), 2))
+
+
+def test_json_round_trip_reports_progress(tmp_path):
+    store = store_of(random_patterns(9, 30))
+    path = tmp_path / "store.json"
+    store.save(path)
+    loaded, progress = PatternStore(), []
+    loaded.load(path, progress=lambda n, b: progress.append((n, b)), chunk_size=100)
+    assert dump(loaded.all_patterns) == dump(store.all_patterns)
+    assert [n for n, _ in progress] == list(range(1, 31))
+    assert progress[-1][1] <= path.stat().st_size
+
+
+def test_binary_round_trip_and_index(tmp_path):
+    patterns = random_patterns(10, 100)
+    # Non-ASCII vocabulary and nested properties
+    patterns[0].problem.structure.entities.append(Entity("u", "ü", {"k": [1, 2, {"x": None}], "f": 1.5}))
+    store = store_of(patterns)
+    path = tmp_path / "store.apsb"
+    store.save_binary(path)
+
+    loaded = PatternStore()
+    loaded.load_binary(path)
+    assert dump(loaded.all_patterns) == dump(store.all_patterns)
+
+    data = path.read_bytes()
+    header = binary.read_header(data)
+    strings = binary.read_block(data, header.strings_offset)
+    for entry, p in zip(binary.read_index(data, header, strings), store.all_patterns):
+        assert entry.pattern_id == p.id
+        assert sorted(entry.preconditions) == sorted(set(p.solution.preconditions))
+        record = binary.decode_record(data[entry.offset:entry.offset + entry.length], strings)
+        assert _pattern_to_dict(record) == _pattern_to_dict(p)
+
+
+def test_binary_files_can_start_mid_stream():
+    patterns = random_patterns(11, 20)
+    buffer = io.BytesIO(b"xyz")
+    buffer.seek(3)
+    assert binary.write_patterns(buffer, patterns) == 20
+    buffer.seek(3)
+    assert dump(p for p, _ in binary.iter_file(buffer)) == dump(patterns)
+
+
+@pytest.mark.parametrize("data", [b"APSB", b"NOPE" + bytes(24), b"APSB\x02\x00" + bytes(22)])
+def test_binary_header_is_validated(data):
+    with pytest.raises(ValueError):
+        binary.read_header(data)
+
+
+def test_mapped_store_answers_like_the_in_memory_store(tmp_path):
+    rng = random.Random(11)
+    store = store_of(random_patterns(11, 300))
+    path = tmp_path / "store.apsb"
+    store.save_binary(path)
+    with MappedPatternStore(path, cache_size=5) as mapped:
+        assert len(mapped) == 300
+        for _ in range(20):
+            problem = random_problem(rng)
+            for threshold in (0.0, 0.5):
+                assert result_key(mapped.match(problem, threshold, 10)) == result_key(store.match(problem, threshold, 10))
+        assert [p.id for p in mapped.search_by_tag("a", "b")] == [p.id for p in store.search_by_tag("a", "b")]
+        assert [p.id for p in mapped.search_by_domain("ml")] == [p.id for p in store.search_by_domain("ml")]
+        assert _pattern_to_dict(mapped.get("pat0007")) == _pattern_to_dict(store.get("pat0007"))
+        assert mapped.get("missing") is None
+        assert len(mapped._patterns._cache) <= 5
+        with pytest.raises(TypeError):
+            mapped.add(store.get("pat0001"))
+
+
+def test_sqlite_store_answers_like_the_in_memory_store(tmp_path):
+    rng = random.Random(12)
+    patterns = random_patterns(12, 200)
+    store = store_of(patterns)
+    path = tmp_path / "store.db"
+    db = SQLitePatternStore(path)
+    db.add_many(patterns[:100])
+    for p in patterns[100:]:
+        db.add(p)
+    for p in patterns[:9]:
+        store.remove(p.id)
+        assert db.remove(p.id)
+    assert not db.remove("missing")
+    db.close()
+
+    db = SQLitePatternStore(path)  # reopened from disk
+    try:
+        assert len(db) == len(store)
+        for _ in range(20):
+            problem = random_problem(rng)
+            for threshold in (0.0, 0.3, 1.0):
+                for k in (None, 4):
+                    assert result_key(db.match(problem, threshold, k)) == result_key(store.match(problem, threshold, k))
+        for tags in [(), ("a",), ("a", "b"), ("a", "b", "c", "d")]:
+            assert [p.id for p in db.search_by_tag(*tags)] == [p.id for p in store.search_by_tag(*tags)]
+        assert [p.id for p in db.search_by_domain("ml")] == [p.id for p in store.search_by_domain("ml")]
+        assert dump(db.all_patterns) == dump(store.all_patterns)
+        store.save(tmp_path / "a.json")
+        db.save(tmp_path / "b.json")
+        assert (tmp_path / "a.json").read_text() == (tmp_path / "b.json").read_text()
+    finally:
+        db.close()
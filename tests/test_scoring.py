@@ -0,0 +1,89 @@
+"""Weighted match scorers against their formulas in scoring.py."""
+
+import math
+import random
+
+import pytest
+
+from factories import FEATURES, random_pattern, random_patterns, random_problem
+from src.scoring import BM25, IDF, Weighted
+from src.store import PatternStore
+
+WEIGHTS = {"tree": 5.0, "cycle": 0.5, "f1": 2.0}
+
+
+def reference_scores(patterns, problem, scorer):
+    """Score of every conditional pattern, computed directly from the definitions."""
+    conditional = [p for p in patterns if p.solution.preconditions]
+    n = len(conditional)
+    df = {f: sum(f in p.solution.preconditions for p in conditional) for f in FEATURES}
+    sizes = {p.id: len(set(p.solution.preconditions)) for p in conditional}
+    average = sum(sizes.values()) / n
+    shortest = min(sizes.values())
+    if isinstance(scorer, IDF):
+        weight = {f: 1 + math.log((1 + n) / (1 + df[f])) for f in FEATURES}
+    elif isinstance(scorer, BM25):
+        weight = {f: math.log(1 + (n - df[f] + 0.5) / (df[f] + 0.5)) for f in FEATURES}
+    else:
+        weight = {f: WEIGHTS.get(f, 1.0) for f in FEATURES}
+
+    def length_norm(size):
+        if not isinstance(scorer, BM25):
+            return 1.0
+        k1, b = scorer.k1, scorer.b
+        return (k1 + 1) / (1 + k1 * (1 - b + b * size / average))
+
+    have = set(problem.match_features)
+    scores = {}
+    for p in conditional:
+        required = set(p.solution.preconditions)
+        if required <= have:
+            scores[p.id] = 1.0
+        else:
+            fraction = sum(weight[f] for f in required & have) / sum(weight[f] for f in required)
+            scores[p.id] = length_norm(sizes[p.id]) / length_norm(shortest) * fraction
+    return scores
+
+
+@pytest.mark.parametrize("scorer", [IDF(), BM25(), BM25(k1=2.0, b=0.3), Weighted(WEIGHTS)], ids=repr)
+def test_weighted_scores_follow_their_formulas(scorer):
+    rng = random.Random(24)
+    patterns = random_patterns(24, 300)
+    store = PatternStore(scorer=scorer)
+    for p in patterns:
+        store.add(p)
+    unconditional = {p.id for p in patterns if not p.solution.preconditions}
+    for _ in range(30):
+        problem = random_problem(rng)
+        expected = reference_scores(patterns, problem, scorer)
+        results = store.match(problem, threshold=0.0)
+        assert [(-r.score, r.pattern.id) for r in results] == sorted((-r.score, r.pattern.id) for r in results)
+        scores = {r.pattern.id: r.score for r in results if r.pattern.id not in unconditional}
+        assert scores == pytest.approx(expected)
+        for pid, score in scores.items():
+            assert (score == 1.0) == (expected[pid] == 1.0)
+        assert {r.pattern.id for r in store.match(problem, threshold=0.5)} - unconditional == {
+            pid for pid, score in scores.items() if score >= 0.5
+        }
+
+
+def test_long_full_matches_score_one_under_bm25():
+    rng = random.Random(25)
+    store = PatternStore(scorer=BM25())
+    for i in range(50):
+        store.add(random_pattern(rng, i))
+    long = random_pattern(rng, 99)
+    long.solution.preconditions = [f"g{i}" for i in range(10)]
+    store.add(long)
+    problem = random_problem(rng)
+    problem.tags = list(long.solution.preconditions)
+    result = next(r for r in store.match(problem, threshold=0.0) if r.pattern is long)
+    assert result.score == 1.0 and result.is_exact
+    problem.tags = problem.tags[:9]
+    assert next(r for r in store.match(problem, threshold=0.0) if r.pattern is long).score < 0.9
+
+
+@pytest.mark.parametrize("weights, default", [({"a": 0.0}, 1.0), ({"a": -1.0}, 1.0), ({}, 0.0)])
+def test_weighted_rejects_non_positive_weights(weights, default):
+    with pytest.raises(ValueError):
+        Weighted(weights, default)
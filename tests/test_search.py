@@ -0,0 +1,104 @@
+"""Tag, domain and boolean-query search against linear scans."""
+
+import random
+
+import pytest
+
+from factories import DOMAINS, FEATURES, random_patterns
+from src.core import CompositionType, GoalType, Instantiation
+from src.query import All, And, CompositionIs, GoalTypeIs, HasPrecondition, HasTag, InDomain, Not, Or
+from src.store import PatternStore
+
+
+def test_tag_and_domain_indexes_follow_store_edits():
+    patterns = random_patterns(13, 200)
+    store = PatternStore()
+    for p in patterns:
+        store.add(p)
+    for p in patterns[:10]:
+        store.remove(p.id)
+    live = patterns[10:]
+    patterns[50].add_instantiation(Instantiation("zz", "a", "b"))
+    patterns[5].add_instantiation(Instantiation("zz", "a", "b"))  # no longer in the store
+
+    for tags in [(), ("a",), ("b", "a"), ("a", "b", "c"), ("q",), ("a", "a")]:
+        assert [p.id for p in store.search_by_tag(*tags)] == [p.id for p in live if set(tags) <= set(p.tags)]
+    for domain in ["math", "se", "ml", "zz", "none"]:
+        assert [p.id for p in store.search_by_domain(domain)] == [p.id for p in live if domain in p.domains_covered]
+
+
+def test_a_pattern_in_two_stores_updates_both_domain_indexes():
+    pattern = random_patterns(14, 1)[0]
+    first, second = PatternStore(), PatternStore()
+    first.add(pattern)
+    second.add(pattern)
+    pattern.add_instantiation(Instantiation("physics", "a", "b"))
+    assert first.search_by_domain("physics") == second.search_by_domain("physics") == [pattern]
+    first.remove(pattern.id)
+    pattern.add_instantiation(Instantiation("biology", "a", "b"))
+    assert not first.search_by_domain("biology") and second.search_by_domain("biology") == [pattern]
+
+
+def evaluate(query, pattern):
+    """Reference semantics of a query, evaluated directly on one pattern."""
+    if isinstance(query, HasTag):
+        return query.value in pattern.tags
+    if isinstance(query, InDomain):
+        return query.value in pattern.domains_covered
+    if isinstance(query, HasPrecondition):
+        return query.value in pattern.solution.preconditions
+    if isinstance(query, GoalTypeIs):
+        return pattern.problem.goal is not None and pattern.problem.goal.type.value == query.value
+    if isinstance(query, CompositionIs):
+        return pattern.solution.transformation.composition_type.value == query.value
+    if isinstance(query, All):
+        return True
+    if isinstance(query, Not):
+        return not evaluate(query.part, pattern)
+    if isinstance(query, And):
+        return all(evaluate(q, pattern) for q in query.parts)
+    if isinstance(query, Or):
+        return any(evaluate(q, pattern) for q in query.parts)
+    raise TypeError(query)
+
+
+def random_query(rng, depth):
+    leaves = [
+        lambda: HasTag(rng.choice("abcdq")),
+        lambda: InDomain(rng.choice(DOMAINS)),
+        lambda: HasPrecondition(rng.choice(FEATURES)),
+        lambda: GoalTypeIs(rng.choice(list(GoalType))),
+        lambda: CompositionIs(rng.choice([c.value for c in CompositionType])),
+        All,
+    ]
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(leaves)()
+    roll = rng.random()
+    if roll < 0.2:
+        return ~random_query(rng, depth - 1)
+    parts = [random_query(rng, depth - 1) for _ in range(rng.randint(0, 3))]
+    return And(*parts) if roll < 0.6 else Or(*parts)
+
+
+def test_queries_agree_with_direct_evaluation():
+    rng = random.Random(14)
+    patterns = random_patterns(14, 300)
+    store = PatternStore()
+    for p in patterns:
+        store.add(p)
+    for p in patterns[:10]:
+        store.remove(p.id)
+    live = patterns[10:]
+    for _ in range(500):
+        query = random_query(rng, 4)
+        expected = [p.id for p in live if evaluate(query, p)]
+        assert [p.id for p in store.query(query)] == expected, query
+        text = str(query)
+        if "()" not in text:  # empty And/Or have no text form
+            assert [p.id for p in store.query(text)] == expected, text
+
+
+@pytest.mark.parametrize("text", ["tag:", "foo:x", "tag:a AND", "(tag:a", "tag:a)", "goal:nope", "hello"])
+def test_malformed_queries_raise_value_error(text):
+    with pytest.raises(ValueError):
+        PatternStore().query(text)
@@ -0,0 +1,74 @@
+"""WL-embedding similarity against a pure-Python cosine reference."""
+
+import random
+
+import pytest
+
+from factories import random_patterns, random_problem, relabel
+from src import similarity
+from src.similarity import SimilarityIndex, _cosine, _squared_norm, embed
+from src.store import PatternStore
+
+
+def cosine(a, b):
+    return _cosine(a, _squared_norm(a), b, _squared_norm(b))
+
+
+def reference(vector, embeddings, k):
+    scored = [(cosine(vector, e), pid) for pid, e in embeddings.items()]
+    return sorted((item for item in scored if item[0] > 0), key=lambda item: (-item[0], item[1]))[:k]
+
+
+@pytest.fixture(scope="module")
+def store():
+    store = PatternStore()
+    for p in random_patterns(23, 400):
+        store.add(p)
+    return store
+
+
+def test_similar_agrees_with_the_reference(store):
+    rng = random.Random(23)
+    embeddings = {p.id: embed(p.problem.structure) for p in store.all_patterns}
+    for _ in range(30):
+        problem = random_problem(rng)
+        for k in (1, 10, 1000):
+            expected = reference(embed(problem.structure), embeddings, k)
+            assert [(m.similarity, m.pattern.id) for m in store.similar(problem, k)] == expected
+            for m in store.similar(problem, k, approximate=True):
+                assert m.similarity == cosine(embed(problem.structure), embeddings[m.pattern.id])
+    assert store.similar(problem, 0) == store.similar(problem, -1) == []
+
+
+def test_an_isomorphic_copy_scores_exactly_one(store):
+    rng = random.Random(23)
+    for pattern in rng.sample(store.all_patterns, 50):
+        if not pattern.problem.structure.entities:
+            continue
+        problem = random_problem(rng)
+        problem.structure = relabel(pattern.problem.structure, rng)
+        exact = store.similar(problem, len(store))
+        assert pattern.id in {m.pattern.id for m in exact if m.similarity == 1.0}
+        assert store.similar(problem, 5, approximate=True)[0].similarity == 1.0
+
+
+def test_numpy_and_pure_python_indexes_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(24)
+    patterns = random_patterns(24, 300)
+    ids = [p.id for p in patterns]
+    embeddings = [embed(p.problem.structure) for p in patterns]
+    queries = [v for v in (embed(random_problem(rng).structure) for _ in range(30)) if v]
+    fast = SimilarityIndex(ids, embeddings)
+    assert fast.matrix is not None
+    expected = [fast.nearest(q, 10) for q in queries]
+    approximate = [fast.approximate(q, 10) for q in queries]
+
+    monkeypatch.setattr(similarity, "np", None)
+    slow = SimilarityIndex(ids, embeddings)
+    assert slow.matrix is None
+    assert [slow.nearest(q, 10) for q in queries] == expected
+    approximate += [slow.approximate(q, 10) for q in queries]
+    for q, results in zip(queries + queries, approximate):
+        assert results == sorted(results, key=lambda item: (-item[0], item[1]))
+        assert all(score == cosine(q, embeddings[ids.index(pid)]) for score, pid in results)
@@ -0,0 +1,181 @@
+"""Structure lookups, cached features and cycle detection against brute force."""
+
+import copy
+import dataclasses
+import pickle
+import random
+
+from factories import ENTITY_TYPES, RELATION_TYPES, random_structure
+from src.core import STRUCTURAL_FEATURES, Entity, Problem, Relation, Structure
+
+
+def brute_neighbors(structure, entity_id, relation_type=None):
+    out = []
+    for r in structure.relations:
+        if relation_type is not None and r.type != relation_type:
+            continue
+        if r.source == entity_id:
+            out.append(r.target)
+        if r.target == entity_id:
+            out.append(r.source)
+    return out
+
+
+def check_lookups(structure):
+    for i in range(8):
+        eid = f"e{i}"
+        assert structure.entity(eid) == next((e for e in structure.entities if e.id == eid), None)
+        for rel_type in [None, *RELATION_TYPES]:
+            assert structure.neighbors(eid, rel_type) == brute_neighbors(structure, eid, rel_type)
+            assert structure.out_relations(eid, rel_type) == [
+                r for r in structure.relations if r.source == eid and rel_type in (None, r.type)
+            ]
+            assert structure.in_relations(eid, rel_type) == [
+                r for r in structure.relations if r.target == eid and rel_type in (None, r.type)
+            ]
+
+
+def test_lookups_follow_appends_and_invalidate():
+    rng = random.Random(2)
+    for _ in range(200):
+        s = random_structure(rng)
+        for _ in range(3):
+            check_lookups(s)
+            # Appends change the list lengths, which the cached index checks
+            s.relations.append(Relation("e0", "e1", "contains"))
+            s.entities.append(Entity(f"e{len(s.entities)}", rng.choice(ENTITY_TYPES)))
+        if s.relations:
+            s.relations[0] = Relation("e3", "e4", "maps_to")
+            s.invalidate()
+            check_lookups(s)
+
+
+def test_lookups_follow_replaced_lists():
+    s = Structure([Entity("a", "t"), Entity("b", "t")], [Relation("a", "b", "x")])
+    assert s.neighbors("a") == ["b"]
+    # Same lengths, new contents: the index must still be rebuilt
+    s.entities = [Entity("a", "t"), Entity("c", "t")]
+    s.relations = [Relation("a", "c", "x")]
+    assert s.neighbors("a") == ["c"]
+    assert s.entity("b") is None and s.entity("c") == Entity("c", "t")
+
+
+def fresh_features(problem):
+    """Features of an uncached copy of the problem's current structure."""
+    s = problem.structure
+    return Problem("x", "x", Structure(list(s.entities), list(s.relations))).structural_features
+
+
+def test_cached_features_follow_structure_edits():
+    rng = random.Random(3)
+    for _ in range(200):
+        problem = Problem("p", "p", random_structure(rng), tags=["t"])
+        assert problem.structural_features == fresh_features(problem)
+        problem.structure.relations.append(Relation("e0", "e1", rng.choice(RELATION_TYPES)))
+        assert problem.structural_features == fresh_features(problem)
+        problem.structure = random_structure(rng)
+        assert problem.structural_features == fresh_features(problem)
+        if problem.structure.entities:
+            problem.structure.entities[0] = Entity("e0", "fresh_type")
+            problem.invalidate()
+            assert problem.structural_features == fresh_features(problem)
+        problem.tags.append("u")
+        assert problem.match_features == frozenset(fresh_features(problem)) | {"t", "u"}
+
+
+def test_caches_stay_out_of_fields_and_copies():
+    problem = Problem("p", "p", Structure([Entity("a", "t"), Entity("b", "t")], [Relation("a", "b", "contains")]))
+    problem.structural_features
+    problem.match_features
+    problem.structure.neighbors("a")
+    assert [f.name for f in dataclasses.fields(Structure)] == ["entities", "relations"]
+    assert [f.name for f in dataclasses.fields(Problem)] == ["id", "name", "structure", "constraints", "goal", "tags"]
+    assert set(dataclasses.asdict(problem)["structure"]) == {"entities", "relations"}
+    for copied in (pickle.loads(pickle.dumps(problem)), copy.deepcopy(problem)):
+        assert copied == problem
+        assert "_features_cache" not in vars(copied) and "_index" not in vars(copied.structure)
+        assert copied.structural_features == problem.structural_features
+
+
+def recursive_has_cycle(structure):
+    """The original recursive DFS check."""
+    if not structure.relations:
+        return False
+    adjacency = {e.id: [] for e in structure.entities}
+    for r in structure.relations:
+        adjacency.setdefault(r.source, []).append(r.target)
+    visited, on_path = set(), set()
+
+    def dfs(node):
+        visited.add(node)
+        on_path.add(node)
+        for nxt in adjacency.get(node, []):
+            if nxt in on_path or (nxt not in visited and dfs(nxt)):
+                return True
+        on_path.discard(node)
+        return False
+
+    return any(dfs(e.id) for e in structure.entities if e.id not in visited)
+
+
+def test_cycle_detection_agrees_with_recursive_dfs():
+    rng = random.Random(4)
+    for _ in range(2000):
+        s = random_structure(rng)
+        assert s.has_feature("cycle") == recursive_has_cycle(s)
+        cycle = s.find_cycle()
+        if cycle is not None:
+            assert cycle[0] == cycle[-1]
+            assert all(any(r.source == a and r.target == b for r in s.relations) for a, b in zip(cycle, cycle[1:]))
+            assert s.topological_order() is None
+        else:
+            position = {n: i for i, n in enumerate(s.topological_order())}
+            assert all(position[r.source] < position[r.target] for r in s.relations)
+
+
+def test_cycle_detection_handles_deep_chains():
+    n = 50_000  # far past the default recursion limit
+    s = Structure(
+        [Entity(f"n{i}", "t") for i in range(n)],
+        [Relation(f"n{i}", f"n{i + 1}", "ordered_before") for i in range(n - 1)],
+    )
+    assert s.find_cycle() is None and len(s.topological_order()) == n
+    s.relations.append(Relation(f"n{n - 1}", "n0", "ordered_before"))
+    assert len(s.find_cycle()) == n + 1
+
+
+def check_against_rebuilt(s):
+    fresh = Structure(list(s.entities), list(s.relations))
+    for feature in STRUCTURAL_FEATURES:
+        assert s.has_feature(feature) == fresh.has_feature(feature), feature
+    assert s.is_connected() == fresh.is_connected()
+    assert s.components() == fresh.components()
+    assert (s.find_cycle() is None) == (fresh.find_cycle() is None)
+    check_lookups(s)
+
+
+def test_builder_edits_agree_with_a_rebuilt_structure():
+    rng = random.Random(25)
+    for _ in range(30):
+        s = random_structure(rng)
+        for _ in range(60):
+            ids = [f"e{i}" for i in range(8)]
+            roll = rng.random()
+            if roll < 0.25:
+                s.add_entity(Entity(rng.choice(ids), rng.choice(ENTITY_TYPES)))
+            elif roll < 0.6:
+                s.add_relation(Relation(rng.choice(ids), rng.choice(ids), rng.choice(RELATION_TYPES)))
+            elif roll < 0.75:
+                eid = rng.choice(ids)
+                present = any(e.id == eid for e in s.entities)
+                assert s.remove_entity(eid) == present
+                assert all(e.id != eid for e in s.entities)
+                if present:
+                    assert all(eid not in (r.source, r.target) for r in s.relations)
+            else:
+                r = rng.choice(s.relations) if s.relations and rng.random() < 0.8 else Relation("e0", "e9", "x")
+                present = r in s.relations
+                assert s.remove_relation(r) == present
+            if rng.random() < 0.5:  # sometimes edit several times between queries
+                check_against_rebuilt(s)
+        check_against_rebuilt(s)